@@ -0,0 +1,43 @@
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+import posts.settings as addition_settings
+from posts.paginator import KeysetPaginator
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Cursor pagination of the API built on the keyset paginator of the feeds
+
+    Pages are selected by the ordering columns of the boundary row, so the
+    API walks the same indexes as the HTML feeds and never counts rows.
+    The ordering is taken from the ``ordering`` attribute of the view.
+    """
+    page_size = addition_settings.NUMBER_ITEM_PAGINATOR_API
+    ordering = ('-pub_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(
+            queryset,
+            self.page_size,
+            ordering=getattr(view, 'ordering', None) or self.ordering
+        )
+        self.page = paginator.get_page(request.query_params)
+        return list(self.page)
+
+    def _link(self, has_page, page_query):
+        if not has_page:
+            return None
+        return self.request.build_absolute_uri('?' + page_query())
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(
+                self.page.has_next(), self.page.next_page_query
+            ),
+            'previous': self._link(
+                self.page.has_previous(), self.page.previous_page_query
+            ),
+            'results': data,
+        })
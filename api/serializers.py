@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from posts.models import Comment, Post
+
+
+class PostSerializer(serializers.ModelSerializer):
+    """
+    Compact post of the feeds, author and group are given by their slugs
+    """
+    author = serializers.CharField(source='author.username')
+    group = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    liked = serializers.BooleanField()
+
+    class Meta:
+        model = Post
+        fields = (
+            'id', 'author', 'group', 'text', 'pub_date', 'image',
+            'likes_count', 'comments_count', 'liked',
+        )
+        read_only_fields = fields
+
+
+class CommentSerializer(serializers.ModelSerializer):
+    author = serializers.CharField(source='author.username')
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'post', 'author', 'text', 'created')
+        read_only_fields = fields
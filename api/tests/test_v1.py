@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.pagination import KeysetCursorPagination
+from posts.models import Comment, Follow, Like, Post
+from posts.tests.test_settings import AllSettings
+
+
+class ApiV1Test(AllSettings):
+    def get(self, name, *args, client=None, **params):
+        client = client or self.guest_client
+        return client.get(reverse(f'api:v1:{name}', args=args), params)
+
+    def test_index(self):
+        Like.objects.create(user=self.user, post=self.post)
+
+        data = self.get('index', client=self.authorized_client).json()
+
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.post.id, self.posts_follow.id]
+        )
+        first = data['results'][0]
+        self.assertEqual(first['author'], self.user.username)
+        self.assertEqual(first['group'], self.group.slug)
+        self.assertEqual(first['likes_count'], 1)
+        self.assertTrue(first['liked'])
+        self.assertIsNone(data['next'])
+
+    def test_cursor_pages(self):
+        with mock.patch.object(KeysetCursorPagination, 'page_size', 1):
+            first = self.get('index').json()
+            second = self.guest_client.get(first['next']).json()
+
+        self.assertEqual(first['results'][0]['id'], self.post.id)
+        self.assertEqual(second['results'][0]['id'], self.posts_follow.id)
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_group_and_profile_feeds(self):
+        Post.objects.create(text='Без группы', author=self.user)
+
+        group = self.get('group_posts', self.group.slug).json()
+        profile = self.get('profile', self.user_2.username).json()
+
+        self.assertEqual(len(group['results']), 2)
+        self.assertEqual(
+            [post['id'] for post in profile['results']],
+            [self.posts_follow.id]
+        )
+        self.assertEqual(
+            self.get('group_posts', 'missing').status_code, 404
+        )
+
+    def test_post_and_comments(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.user_2, text='!'
+        )
+
+        post = self.get('post', self.post.id).json()
+        comments = self.get('comments', self.post.id).json()
+
+        self.assertEqual(post['text'], self.post.text)
+        self.assertEqual(post['comments_count'], 1)
+        self.assertEqual(comments['results'][0]['id'], comment.id)
+        self.assertEqual(
+            comments['results'][0]['author'], self.user_2.username
+        )
+
+    def test_follow_feed_needs_jwt(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+        self.assertEqual(self.get('follow_index').status_code, 401)
+
+        token = self.guest_client.post(
+            reverse('api:v1:token'),
+            {'username': self.user.username, 'password': 'akakii228'}
+        ).json()['access']
+        response = self.guest_client.get(
+            reverse('api:v1:follow_index'),
+            HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [self.posts_follow.id]
+        )
+
+    def test_feed_queries_do_not_grow_with_page(self):
+        for number in range(5):
+            Post.objects.create(
+                text=f'Пост {number}', author=self.user_3, group=self.group
+            )
+
+        def count(page_size):
+            with mock.patch.object(
+                KeysetCursorPagination, 'page_size', page_size
+            ), CaptureQueriesContext(connection) as queries:
+                self.get('index', client=self.authorized_client)
+            return len(queries)
+
+        # The first request reads the session from the database
+        self.get('index', client=self.authorized_client)
+        self.assertEqual(count(2), count(7))
+
+    def test_payload_is_smaller_than_html(self):
+        api = self.get('index').content
+        html = self.guest_client.get(reverse('posts:index')).content
+
+        self.assertLess(len(api) * 4, len(html))
@@ -0,0 +1,39 @@
+from django.urls import include, path
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView, TokenRefreshView
+)
+
+from . import views
+
+app_name = 'api'
+
+v1_patterns = [
+    path('auth/token/', TokenObtainPairView.as_view(), name='token'),
+    path(
+        'auth/token/refresh/',
+        TokenRefreshView.as_view(),
+        name='token_refresh'
+    ),
+    path('posts/', views.IndexView.as_view(), name='index'),
+    path('posts/<int:post_id>/', views.PostView.as_view(), name='post'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.CommentsView.as_view(),
+        name='comments'
+    ),
+    path('follow/', views.FollowView.as_view(), name='follow_index'),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.GroupPostsView.as_view(),
+        name='group_posts'
+    ),
+    path(
+        'users/<str:username>/posts/',
+        views.ProfilePostsView.as_view(),
+        name='profile'
+    ),
+]
+
+urlpatterns = [
+    path('v1/', include((v1_patterns, 'v1'))),
+]
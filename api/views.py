@@ -0,0 +1,66 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions
+
+from posts import timeline
+from posts.models import Group, Post
+from users.cache import get_user_or_404
+
+from .serializers import CommentSerializer, PostSerializer
+
+
+class FeedView(generics.ListAPIView):
+    """
+    Base of the post feeds: subclasses give the posts, the page is loaded
+    with authors, groups and the like state of the viewer in one query
+    """
+    serializer_class = PostSerializer
+    ordering = ('-pub_date', '-id')
+
+    def get_posts(self):
+        return Post.objects.all()
+
+    def get_queryset(self):
+        return self.get_posts().for_feed(self.request.user)
+
+
+class IndexView(FeedView):
+    pass
+
+
+class GroupPostsView(FeedView):
+    def get_posts(self):
+        group = get_object_or_404(Group, slug=self.kwargs['slug'])
+        return group.posts.all()
+
+
+class ProfilePostsView(FeedView):
+    def get_posts(self):
+        author = get_user_or_404(self.kwargs['username'])
+        return author.posts.all()
+
+
+class FollowView(FeedView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_posts(self):
+        posts, self.ordering = timeline.follow_feed(self.request.user)
+        return posts
+
+
+class PostView(generics.RetrieveAPIView):
+    serializer_class = PostSerializer
+    lookup_url_kwarg = 'post_id'
+
+    def get_queryset(self):
+        return Post.objects.for_feed(self.request.user)
+
+
+class CommentsView(generics.ListAPIView):
+    serializer_class = CommentSerializer
+    ordering = ('-created', '-id')
+
+    def get_queryset(self):
+        post = get_object_or_404(
+            Post.objects.only('id'), id=self.kwargs['post_id']
+        )
+        return post.comments.select_related('author')
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Follow, Group, Like, Post
 
 
@@ -9,6 +10,18 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not (
+            search.available() and search.match_expression(search_term)
+        ):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return (
+            queryset.filter(pk__in=search.post_ids_matching(search_term)),
+            False
+        )
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'description', 'slug')
@@ -0,0 +1,155 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+import posts.settings as addition_settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = re.compile(
+    r'\.(css|js|map|svg|json|txt|html|xml|ico|ttf|otf|eot)$'
+)
+# Names written by ManifestStaticFilesStorage: 12 hex digits of md5
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class AssetsStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage writing content-hashed copies and a manifest
+
+    Files missing from the manifest keep their plain names, so a checkout
+    where build_static has not been run yet still renders its pages
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def _write_smaller(path, suffix, data, original_size):
+    if len(data) >= original_size:
+        return False
+    with open(path + suffix, 'wb') as file:
+        file.write(data)
+    shutil.copystat(path, path + suffix)
+    return True
+
+
+def compress(path):
+    """
+    Writes .gz and (if brotli is installed) .br siblings of the file
+
+    A sibling is kept only when it is smaller than the file itself.
+    Returns the suffixes written.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    written = []
+    if _write_smaller(
+        path, '.gz',
+        gzip.compress(data, addition_settings.STATIC_GZIP_LEVEL, mtime=0),
+        len(data)
+    ):
+        written.append('.gz')
+    if brotli is not None and _write_smaller(
+        path, '.br',
+        brotli.compress(data, quality=addition_settings.STATIC_BROTLI_LEVEL),
+        len(data)
+    ):
+        written.append('.br')
+    return written
+
+
+def compress_tree(root):
+    """
+    Compresses every compressible file under the root, returns their count
+    """
+    total = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if COMPRESSIBLE.search(name):
+                compress(os.path.join(directory, name))
+                total += 1
+    return total
+
+
+def accepted_encodings(request):
+    """
+    Content codings the client accepts, those with q=0 are left out
+    """
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """
+    Serves a built static file, precompressed if the client accepts it
+
+    Content-hashed names never change their content, so they are sent
+    with a year-long immutable Cache-Control
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    variant, encoding = fullpath, None
+    accepted = accepted_encodings(request)
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(fullpath + suffix):
+            variant, encoding = fullpath + suffix, coding
+            break
+
+    stat = os.stat(variant)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime, stat.st_size
+    ):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(fullpath)
+        response = FileResponse(
+            open(variant, 'rb'),
+            content_type=content_type or 'application/octet-stream'
+        )
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if encoding is not None:
+            response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = (
+            f'public, max-age={addition_settings.STATIC_IMMUTABLE_MAX_AGE}, '
+            'immutable'
+        )
+    else:
+        response['Cache-Control'] = (
+            f'public, max-age={addition_settings.STATIC_MAX_AGE}'
+        )
+    return response
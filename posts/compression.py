@@ -0,0 +1,172 @@
+import re
+import time
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+import posts.settings as addition_settings
+
+from . import metrics
+from .assets import accepted_encodings, brotli
+
+# Media types whose bodies are compressed already (svg is plain text)
+INCOMPRESSIBLE = re.compile(
+    r'^(image/(?!svg)|audio/|video/|font/woff|application/(zip|gzip|x-gzip'
+    r'|x-brotli|pdf|octet-stream|x-7z-compressed|x-rar-compressed)$)'
+)
+RATIO_BUCKETS = (1, 1.5, 2, 3, 4, 6, 8, 12, 16, 24)
+CPU_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1
+)
+
+COMPRESSION_RATIO = metrics.register(metrics.Histogram(
+    'yatube_response_compression_ratio',
+    'Size of a response body divided by its compressed size',
+    RATIO_BUCKETS,
+    labels=('view', 'encoding'),
+))
+COMPRESSION_SECONDS = metrics.register(metrics.Histogram(
+    'yatube_response_compression_cpu_seconds',
+    'CPU time of the thread spent compressing one response',
+    CPU_BUCKETS,
+    labels=('view', 'encoding'),
+))
+
+
+class Encoder:
+    """
+    Compresses one response body, counting its sizes and CPU time
+
+    The entrance accepts:
+        ~ encoding - 'br' or 'gzip'
+        ~ view - view label of the request for the metrics
+    """
+    def __init__(self, encoding, view):
+        self.encoding = encoding
+        self.view = view
+        self.raw = 0
+        self.compressed = 0
+        self.seconds = 0.0
+        if encoding == 'br':
+            compressor = brotli.Compressor(
+                quality=addition_settings.RESPONSE_BROTLI_LEVEL
+            )
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(
+                addition_settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED,
+                16 + zlib.MAX_WBITS
+            )
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def _timed(self, compress, *args):
+        started = time.thread_time()
+        data = compress(*args)
+        self.seconds += time.thread_time() - started
+        self.compressed += len(data)
+        return data
+
+    def write(self, data, flush=False):
+        """
+        Compresses a part of the body
+
+        With flush everything written so far can be decoded by the client,
+        so a streamed page is shown while the rest of it is rendered.
+        """
+        self.raw += len(data)
+        data = self._timed(self._compress, data)
+        if flush:
+            data += self._timed(self._flush)
+        return data
+
+    def close(self):
+        data = self._timed(self._finish)
+        self.observe()
+        return data
+
+    def observe(self):
+        COMPRESSION_SECONDS.observe(self.seconds, self.view, self.encoding)
+        if self.compressed:
+            COMPRESSION_RATIO.observe(
+                self.raw / self.compressed, self.view, self.encoding
+            )
+
+
+def _stream(encoder, content):
+    for chunk in content:
+        data = encoder.write(chunk, flush=True)
+        if data:
+            yield data
+    yield encoder.close()
+
+
+def _skipped(response):
+    content_type = response.get('Content-Type', '')
+    media_type = content_type.split(';')[0].strip().lower()
+    return (
+        response.has_header('Content-Encoding')
+        or response.has_header('Content-Range')
+        or 'no-transform' in response.get('Cache-Control', '')
+        or bool(INCOMPRESSIBLE.match(media_type))
+        or not response.streaming and len(response.content) < (
+            addition_settings.RESPONSE_COMPRESS_MIN_LENGTH
+        )
+    )
+
+
+def choose_encoding(request):
+    """
+    Best content coding the client accepts and this process can produce
+    """
+    accepted = accepted_encodings(request)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses HTML and JSON responses with brotli or gzip on the fly
+
+    Streaming responses are compressed chunk by chunk, each chunk flushed,
+    so they stay streaming. Bodies of compressed media types, already
+    encoded bodies and short ones are sent as is. The levels are lower
+    than for the static files: the work is done on every request.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if _skipped(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+
+        encoder = Encoder(encoding, metrics.view_name(request))
+        if response.streaming:
+            response.streaming_content = _stream(
+                encoder, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            content = encoder.write(response.content) + encoder.close()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from . import seeding
+from .models import AuthorRank, last_post_date
+
+User = get_user_model()
+
+SORTS = {
+    'followers': 'by_followers',
+    'activity': 'by_activity',
+    'name': 'by_name',
+}
+SORT_LABELS = (
+    ('name', 'По имени'),
+    ('followers', 'По подписчикам'),
+    ('activity', 'По активности'),
+)
+DEFAULT_SORT = 'name'
+
+
+def resolve_sort(sort):
+    """
+    Name of the requested sort, unknown sorts fall back to the default one
+    """
+    return sort if sort in SORTS else DEFAULT_SORT
+
+
+def ranked_users():
+    """
+    Users with their directory data and positions in every sort order
+    """
+    return User.objects.annotate(
+        followers=Coalesce(F('stats__followers_count'), 0),
+        activity=Coalesce(last_post_date('author'), F('date_joined')),
+    ).annotate(
+        followers_position=Window(
+            RowNumber(), order_by=[F('followers').desc(), F('id').asc()]
+        ),
+        activity_position=Window(
+            RowNumber(), order_by=[F('activity').desc(), F('id').asc()]
+        ),
+        name_position=Window(
+            RowNumber(), order_by=[
+                F('first_name').asc(), F('last_name').asc(),
+                F('username').asc(), F('id').asc(),
+            ]
+        ),
+    ).order_by()
+
+
+def refresh(chunk_size=None):
+    """
+    Recomputes the author directory, returns the number of its entries
+
+    The table is replaced in one transaction, readers see either the old
+    or the new ranking
+    """
+    rows = ranked_users().values_list(
+        'id', 'followers', 'activity',
+        'followers_position', 'activity_position', 'name_position',
+    )
+    with transaction.atomic():
+        AuthorRank.objects.all().delete()
+        return seeding.load(
+            AuthorRank,
+            (
+                AuthorRank(
+                    user_id=user_id,
+                    followers_count=followers,
+                    last_activity=activity,
+                    by_followers=by_followers,
+                    by_activity=by_activity,
+                    by_name=by_name,
+                )
+                for user_id, followers, activity,
+                by_followers, by_activity, by_name in rows.iterator()
+            ),
+            chunk_size
+        )
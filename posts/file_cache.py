@@ -0,0 +1,351 @@
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .metrics import InstrumentedCacheMixin
+
+# SQLite builds before 3.32 allow at most 999 parameters in a statement
+MAX_PARAMS = 900
+# Access time of an entry is rewritten at most this often, reads stay reads
+ACCESS_RESOLUTION = 1.0
+STATS_FLUSH_SECONDS = 5.0
+# Eviction frees the cache down to this share of MAX_BYTES
+CULL_TARGET = 0.9
+# Bytes accounted for an entry besides its key and value
+ENTRY_OVERHEAD = 32
+
+_PREFIX = re.compile(r'^[^:.|]*(?:(?:[:.]|\|\|)[^:.|]*)?')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entry (
+    key TEXT PRIMARY KEY,
+    prefix TEXT NOT NULL,
+    value BLOB,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entry_accessed_idx ON entry (accessed);
+CREATE TABLE IF NOT EXISTS usage (
+    prefix TEXT PRIMARY KEY,
+    entries INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS entry_inserted AFTER INSERT ON entry BEGIN
+    INSERT INTO usage (prefix) VALUES (new.prefix)
+        ON CONFLICT (prefix) DO NOTHING;
+    UPDATE usage SET entries = entries + 1, bytes = bytes + new.size
+        WHERE prefix = new.prefix;
+END;
+CREATE TRIGGER IF NOT EXISTS entry_updated AFTER UPDATE OF size ON entry
+BEGIN
+    UPDATE usage SET bytes = bytes - old.size + new.size
+        WHERE prefix = new.prefix;
+END;
+CREATE TRIGGER IF NOT EXISTS entry_deleted AFTER DELETE ON entry BEGIN
+    UPDATE usage SET entries = entries - 1, bytes = bytes - old.size
+        WHERE prefix = old.prefix;
+END;
+'''
+
+
+def key_prefix(key):
+    """
+    Statistics group of the key: its first two parts, like 'posts:page'
+    or 'sorl-thumbnail||image'
+    """
+    return _PREFIX.match(key).group()
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), MAX_PARAMS):
+        yield items[start:start + MAX_PARAMS]
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache shared by all processes of the node through one SQLite file
+
+    Values are pickled, integers are stored as they are so incr() is a
+    single UPDATE inside a write transaction, atomic across processes.
+    The total size of keys and values is bounded by MAX_BYTES: the least
+    recently used entries are evicted first. Usage, hits, misses and
+    evictions are counted per key prefix, see stats().
+
+    The entrance accepts (OPTIONS):
+        ~ MAX_BYTES - bound of the cache size
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._local = threading.local()
+        self._counts = {}
+        self._counts_lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+    @property
+    def _db(self):
+        # Connections are not shared between threads or forked processes
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.executescript(SCHEMA)
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _write(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _prefix(self, key):
+        # make_key() puts KEY_PREFIX and the version in front of the key
+        return key_prefix(key.split(':', 2)[-1])
+
+    def _count(self, prefix, field, amount=1):
+        if not amount:
+            return
+        with self._counts_lock:
+            counts = self._counts.setdefault(prefix, {'hits': 0, 'misses': 0})
+            counts[field] += amount
+            due = time.monotonic() - self._flushed >= STATS_FLUSH_SECONDS
+        if due:
+            self._flush_counts()
+
+    def _flush_counts(self):
+        with self._counts_lock:
+            counts, self._counts = self._counts, {}
+            self._flushed = time.monotonic()
+        if not counts:
+            return
+        with self._write() as db:
+            db.executemany(
+                'INSERT INTO usage (prefix, hits, misses) VALUES (?, ?, ?) '
+                'ON CONFLICT (prefix) DO UPDATE SET '
+                'hits = hits + excluded.hits, '
+                'misses = misses + excluded.misses',
+                [
+                    (prefix, values['hits'], values['misses'])
+                    for prefix, values in counts.items()
+                ]
+            )
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value, 8
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return data, len(data)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _row(self, key, value, expires):
+        value, size = self._encode(value)
+        return (
+            key, self._prefix(key), value, expires, time.time(),
+            size + len(key) + ENTRY_OVERHEAD,
+        )
+
+    def _store(self, db, rows):
+        db.executemany(
+            'INSERT INTO entry (key, prefix, value, expires, accessed, size) '
+            'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed, size = excluded.size',
+            rows
+        )
+        self._cull(db)
+
+    def _cull(self, db):
+        total = db.execute('SELECT total(bytes) FROM usage').fetchone()[0]
+        if total <= self._max_bytes:
+            return
+        db.execute(
+            'DELETE FROM entry WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),)
+        )
+        excess = (
+            db.execute('SELECT total(bytes) FROM usage').fetchone()[0]
+            - self._max_bytes * CULL_TARGET
+        )
+        victims, evicted = [], {}
+        cursor = db.execute(
+            'SELECT key, prefix, size FROM entry ORDER BY accessed'
+        )
+        for key, prefix, size in cursor:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            evicted[prefix] = evicted.get(prefix, 0) + 1
+            excess -= size
+        cursor.close()
+        db.executemany('DELETE FROM entry WHERE key = ?', victims)
+        db.executemany(
+            'UPDATE usage SET evictions = evictions + ? WHERE prefix = ?',
+            [(count, prefix) for prefix, count in evicted.items()]
+        )
+
+    def _fetch(self, keys):
+        now = time.time()
+        found, stale = {}, []
+        for chunk in _chunks(keys):
+            marks = ','.join('?' * len(chunk))
+            for key, value, expires, accessed in self._db.execute(
+                'SELECT key, value, expires, accessed FROM entry '
+                f'WHERE key IN ({marks})', chunk
+            ):
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = self._decode(value)
+                if now - accessed >= ACCESS_RESOLUTION:
+                    stale.append((now, key))
+        if stale:
+            with self._write() as db:
+                db.executemany(
+                    'UPDATE entry SET accessed = ? WHERE key = ?', stale
+                )
+        for key in keys:
+            self._count(
+                self._prefix(key), 'hits' if key in found else 'misses'
+            )
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        return {
+            names[key]: value
+            for key, value in self._fetch(list(names)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        row = self._row(key, value, self.get_backend_timeout(timeout))
+        with self._write() as db:
+            self._store(db, [row])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            self._row(self._key(key, version), value, expires)
+            for key, value in data.items()
+        ]
+        with self._write() as db:
+            self._store(db, rows)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            db.execute(
+                'DELETE FROM entry WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            exists = db.execute(
+                'SELECT 1 FROM entry WHERE key = ?', (key,)
+            ).fetchone()
+            if exists:
+                return False
+            self._store(
+                db, [self._row(key, value, self.get_backend_timeout(timeout))]
+            )
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            cursor = db.execute(
+                'UPDATE entry SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time())
+            )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        name, key = key, self._key(key, version)
+        with self._write() as db:
+            row = db.execute(
+                'SELECT value, expires FROM entry '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{name}' not found")
+            current, expires = row
+            if isinstance(current, int):
+                db.execute(
+                    'UPDATE entry SET value = value + ? WHERE key = ?',
+                    (delta, key)
+                )
+                return current + delta
+            value = self._decode(current) + delta
+            self._store(db, [self._row(key, value, expires)])
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'SELECT 1 FROM entry '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        with self._write() as db:
+            db.executemany('DELETE FROM entry WHERE key = ?', keys)
+
+    def clear(self):
+        with self._write() as db:
+            db.execute('DELETE FROM entry')
+
+    def stats(self):
+        """
+        Entries, bytes, hits, misses and evictions of every key prefix
+        """
+        self._flush_counts()
+        columns = ('entries', 'bytes', 'hits', 'misses', 'evictions')
+        rows = self._db.execute(
+            f'SELECT prefix, {", ".join(columns)} FROM usage ORDER BY prefix'
+        )
+        return {row[0]: dict(zip(columns, row[1:])) for row in rows}
+
+
+class InstrumentedSQLiteCache(InstrumentedCacheMixin, SQLiteCache):
+    pass
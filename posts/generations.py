@@ -0,0 +1,59 @@
+import time
+
+from django.core.cache import cache
+
+import posts.settings as addition_settings
+
+GENERATION_KEY = 'posts:generation:{}'
+GLOBAL = 'global'
+
+
+def scope(kind, pk):
+    """
+    Name of the cache scope of one group, author or post
+    """
+    return f'{kind}:{pk}'
+
+
+def _init(key):
+    # A lost counter restarts from the clock, so it can never come back to
+    # a value that is still baked into cached fragments
+    cache.add(key, time.time_ns(), None)
+
+
+def generations(*scopes):
+    """
+    Current generations of the scopes joined into one cache key part
+    """
+    keys = [GENERATION_KEY.format(name) for name in scopes]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            _init(key)
+        values.update(cache.get_many(missing))
+    return '.'.join(
+        f'{name}={values.get(key)}' for name, key in zip(scopes, keys)
+    )
+
+
+def bump(*scopes):
+    """
+    Invalidates everything cached under the scopes
+    """
+    for name in set(scopes):
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            _init(key)
+
+
+def fragment_context(*scopes):
+    """
+    Template context for {% cache %} blocks depending on the scopes
+    """
+    return {
+        'cache_version': generations(*scopes),
+        'cache_ttl': addition_settings.FEED_CACHE_TTL,
+    }
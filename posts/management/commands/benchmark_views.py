@@ -0,0 +1,302 @@
+import json
+import math
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count
+from django.http import QueryDict
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import posts.settings as addition_settings
+from posts import directory, seeding, timeline
+from posts.models import AuthorRank, Group, Post
+from posts.paginator import KeysetPaginator
+from yatube.test_runner import private_cache
+
+User = get_user_model()
+
+VOLUMES = {
+    'users': 200,
+    'groups': 20,
+    'posts': 5000,
+    'comments': 10000,
+    'likes': 20000,
+    'follows': 4000,
+}
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of the values
+    """
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def deep_query(paginator, depth):
+    """
+    GET query of the page the given number of pages deep into a feed
+    """
+    query = QueryDict()
+    for _ in range(depth):
+        page = paginator.get_page(query)
+        if not page.has_next():
+            break
+        query = QueryDict(page.next_page_query())
+    return query.urlencode()
+
+
+def compare(baseline, results, threshold):
+    """
+    Lines describing changes against the baseline and the regressions
+    """
+    lines, regressions = [], []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            lines.append(f'{name}: new scenario')
+            continue
+        change = (
+            (current['p95_ms'] - previous['p95_ms'])
+            / max(previous['p95_ms'], 1e-9) * 100
+        )
+        queries = current['queries'] - previous['queries']
+        lines.append(
+            f'{name}: p95 {previous["p95_ms"]:.1f} -> '
+            f'{current["p95_ms"]:.1f} ms ({change:+.1f}%), '
+            f'queries {previous["queries"]} -> {current["queries"]}'
+        )
+        if change > threshold or queries > 0:
+            regressions.append(name)
+    return lines, regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway database and measures latency, queries and '
+        'memory of the posts views'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in VOLUMES.items():
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Number of {name} to seed (default {default})',
+            )
+        parser.add_argument(
+            '--requests', type=int, default=30,
+            help='Measured requests per scenario',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Unmeasured requests per scenario before measuring',
+        )
+        parser.add_argument(
+            '--depth', type=int, default=20,
+            help='How many pages deep the deep scenarios go',
+        )
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Keep caches between requests instead of clearing them',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Random seed of the data',
+        )
+        parser.add_argument(
+            '--save', metavar='PATH',
+            help='Save results as a JSON baseline',
+        )
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Compare results with a saved baseline',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='p95 growth in percent reported as a regression',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Exit with an error if there are regressions',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        volumes = {name: options[name] for name in VOLUMES}
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # The benchmark clears the cache, the running site must not notice
+        try:
+            with private_cache(), override_settings(DEBUG=False):
+                started = time.perf_counter()
+                seeding.seed(random_seed=options['seed'], **volumes)
+                seeding.rebuild_derived()
+                self.stdout.write(
+                    f'Seeded in {time.perf_counter() - started:.1f} s'
+                )
+                results = {
+                    name: self.measure(client, url, options)
+                    for name, client, url in self.scenarios(options['depth'])
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24} p50 {result["p50_ms"]:8.1f} ms  '
+                f'p95 {result["p95_ms"]:8.1f} ms  '
+                f'p99 {result["p99_ms"]:8.1f} ms  '
+                f'queries {result["queries"]:4}  '
+                f'peak {result["peak_kib"]:8.0f} KiB'
+            )
+
+        report = {
+            'volumes': volumes,
+            'warm_cache': options['warm_cache'],
+            'results': results,
+        }
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Baseline saved to {options["save"]}')
+
+        if baseline is not None:
+            if baseline.get('volumes') != volumes:
+                self.stdout.write(self.style.WARNING(
+                    'Baseline was measured with other volumes'
+                ))
+            lines, regressions = compare(
+                baseline['results'], results, options['threshold']
+            )
+            for line in lines:
+                self.stdout.write(line)
+            if regressions:
+                message = f'Regressions: {", ".join(regressions)}'
+                if options['fail_on_regression']:
+                    raise CommandError(message)
+                self.stdout.write(self.style.WARNING(message))
+            else:
+                self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    def scenarios(self, depth):
+        """
+        (name, client, url) of shallow and deep pages of every view
+        """
+        post_page = addition_settings.NUMBER_ITEM_PAGINATOR_POST
+        reader = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows').first()
+        author = User.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        post = Post.objects.order_by('-comments_count').first()
+        follow_posts, follow_ordering = timeline.follow_feed(reader)
+
+        client = Client()
+        client.force_login(reader)
+
+        feeds = {
+            'index': (
+                reverse('posts:index'),
+                KeysetPaginator(Post.objects.all(), post_page),
+            ),
+            'group_posts': (
+                reverse('posts:group_posts', args=(group.slug,)),
+                KeysetPaginator(group.posts.all(), post_page),
+            ),
+            'profile': (
+                reverse('posts:profile', args=(author.username,)),
+                KeysetPaginator(author.posts.all(), post_page),
+            ),
+            'post_view': (
+                reverse('posts:post', args=(post.author.username, post.id)),
+                KeysetPaginator(
+                    post.comments.all(),
+                    addition_settings.NUMBER_ITEM_PAGINATOR_COMMENTS,
+                    ordering=('-created', '-id'),
+                ),
+            ),
+            'follow_index': (
+                reverse('posts:follow_index'),
+                KeysetPaginator(
+                    follow_posts, post_page, ordering=follow_ordering
+                ),
+            ),
+            'authors_index': (
+                reverse('posts:all_authors'),
+                KeysetPaginator(
+                    AuthorRank.objects.all(),
+                    addition_settings.NUMBER_ITEM_PAGINATOR_ALL_AUTHORS,
+                    ordering=(directory.SORTS[directory.DEFAULT_SORT],),
+                ),
+            ),
+        }
+        for name, (url, paginator) in feeds.items():
+            yield name, client, url
+            yield f'{name}_deep', client, (
+                f'{url}?{deep_query(paginator, depth)}'
+            )
+
+        url = reverse('posts:groups')
+        last = Paginator(
+            range(Group.objects.count()),
+            addition_settings.NUMBER_ITEM_PAGINATOR_ALL_GROUPS
+        ).num_pages
+        yield 'groups', client, url
+        yield 'groups_deep', client, f'{url}?page={min(depth, last)}'
+
+    def measure(self, client, url, options):
+        def request():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} answered {response.status_code}')
+
+        def prepare():
+            if not options['warm_cache']:
+                cache.clear()
+
+        for _ in range(options['warmup']):
+            prepare()
+            request()
+
+        timings, queries = [], []
+        for _ in range(options['requests']):
+            prepare()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # Memory is traced in a separate pass, tracing slows requests down
+        prepare()
+        tracemalloc.start()
+        try:
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'queries': max(queries),
+            'peak_kib': peak / 1024,
+        }
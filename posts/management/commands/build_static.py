@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Collects static files under content-hashed names and writes '
+        'gzip and brotli siblings of them (brotli needs the brotli package)'
+    )
+
+    def handle(self, *args, **options):
+        call_command(
+            'collectstatic', interactive=False, verbosity=0,
+            stdout=self.stdout
+        )
+        total = assets.compress_tree(settings.STATIC_ROOT)
+        if assets.brotli is None:
+            self.stdout.write(
+                self.style.WARNING(
+                    'brotli is not installed, only gzip siblings written'
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Static files built in {settings.STATIC_ROOT}, '
+                f'{total} compressed'
+            )
+        )
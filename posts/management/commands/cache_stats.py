@@ -0,0 +1,27 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Shows entries, size, hits, misses and evictions per key prefix'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias', default='default', help='Cache alias (default default)',
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not hasattr(cache, 'stats'):
+            raise CommandError(
+                f'Cache {options["alias"]} does not keep statistics'
+            )
+        for prefix, stats in cache.stats().items():
+            lookups = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / lookups * 100 if lookups else 0
+            self.stdout.write(
+                f'{prefix:<28} entries {stats["entries"]:7}  '
+                f'{stats["bytes"] / 1024:10.1f} KiB  '
+                f'hits {ratio:5.1f}% of {lookups:8}  '
+                f'evictions {stats["evictions"]:6}'
+            )
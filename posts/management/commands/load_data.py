@@ -0,0 +1,89 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+VOLUMES = ('users', 'groups', 'posts', 'comments', 'follows', 'likes')
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk loads users, groups, posts, comments, follows and likes '
+        'generated at random or streamed from a JSONL file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='source', metavar='PATH',
+            help='JSONL file to import ("-" for stdin) instead of '
+                 'generating rows',
+        )
+        for name in VOLUMES:
+            parser.add_argument(
+                f'--{name}', type=int,
+                help=f'Number of {name} to generate',
+            )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed of the generated rows',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int,
+            help='Rows per INSERT transaction',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Do not rebuild counters, timelines and the search index',
+        )
+
+    def report(self, model, rows, seconds):
+        self.total += rows
+        self.stdout.write(
+            f'{model.__name__}: {rows} rows in {seconds:.1f} s '
+            f'({rows / max(seconds, 1e-9):.0f} rows/s)'
+        )
+
+    def handle(self, *args, **options):
+        self.total = 0
+        started = time.perf_counter()
+        file = None
+        if options['source'] == '-':
+            batches = seeding.read_jsonl(sys.stdin)
+        elif options['source']:
+            try:
+                file = open(options['source'], encoding='utf-8')
+            except OSError as error:
+                raise CommandError(error)
+            batches = seeding.read_jsonl(file)
+        else:
+            batches = seeding.generate(
+                random_seed=options['seed'],
+                **{
+                    name: options[name] for name in VOLUMES
+                    if options[name] is not None
+                }
+            )
+
+        try:
+            seeding.run(batches, options['chunk_size'], report=self.report)
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if file is not None:
+                file.close()
+
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            f'Loaded {self.total} rows in {seconds:.1f} s '
+            f'({self.total / max(seconds, 1e-9):.0f} rows/s)'
+        )
+        if not options['skip_rebuild']:
+            rebuild_started = time.perf_counter()
+            seeding.rebuild_derived()
+            self.stdout.write(
+                f'Derived data rebuilt in '
+                f'{time.perf_counter() - rebuild_started:.1f} s'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from posts.models import (
+    AuthorStats, Comment, Group, Like, Post, count_related
+)
+
+User = get_user_model()
+
+AUTHOR_FIELDS = (
+    'followers_count', 'following_count', 'posts_count', 'likes_count'
+)
+GROUP_FIELDS = ('posts_count', 'last_post_at')
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds (or only verifies) denormalized counters of posts '
+        'and groups and statistics of authors'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted counters, do not fix them',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_posts()
+            self.check_drift(
+                'Author', 'Authors with drifted statistics',
+                AuthorStats.objects, AUTHOR_FIELDS
+            )
+            self.stdout.write(
+                'Authors without statistics: '
+                f'{User.objects.filter(stats__isnull=True).count()}'
+            )
+            self.check_drift(
+                'Group', 'Groups with drifted counters',
+                Group.objects, GROUP_FIELDS
+            )
+            return
+
+        with transaction.atomic():
+            updated = Post.objects.update(
+                likes_count=count_related(Like),
+                comments_count=count_related(Comment),
+            )
+            created = self.create_missing_stats()
+            authors = AuthorStats.objects.update(
+                **AuthorStats.objects.actual_counters()
+            )
+            groups = Group.objects.update(**Group.objects.actual_counters())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Counters rebuilt for {updated} posts, {groups} groups '
+                f'and {authors} authors ({created} statistics created)'
+            )
+        )
+
+    def create_missing_stats(self):
+        missing = User.objects.filter(stats__isnull=True).values_list(
+            'id', flat=True
+        )
+        created = AuthorStats.objects.bulk_create(
+            AuthorStats(user_id=user_id) for user_id in missing.iterator()
+        )
+        return len(created)
+
+    def check_posts(self):
+        drifted = Post.objects.annotate_actual_counters().filter(
+            ~Q(likes_count=F('actual_likes_count'))
+            | ~Q(comments_count=F('actual_comments_count'))
+        )
+        total = 0
+        for post in drifted.only('id', 'likes_count', 'comments_count'):
+            total += 1
+            self.stdout.write(
+                f'Post {post.id}: '
+                f'likes {post.likes_count} != {post.actual_likes_count}, '
+                f'comments {post.comments_count} != '
+                f'{post.actual_comments_count}'
+            )
+        self.stdout.write(f'Posts with drifted counters: {total}')
+
+    def check_drift(self, label, summary, queryset, fields):
+        # Spelled without negation, so NULL equal to NULL is no drift
+        condition = Q()
+        for field in fields:
+            actual = f'actual_{field}'
+            condition |= (
+                Q(**{f'{field}__lt': F(actual)})
+                | Q(**{f'{field}__gt': F(actual)})
+                | Q(**{f'{field}__isnull': True, f'{actual}__isnull': False})
+                | Q(**{f'{field}__isnull': False, f'{actual}__isnull': True})
+            )
+        drifted = queryset.annotate_actual_counters().filter(condition)
+        total = 0
+        for item in drifted:
+            total += 1
+            changes = ', '.join(
+                f'{field} {getattr(item, field)} != '
+                f'{getattr(item, "actual_" + field)}'
+                for field in fields
+                if getattr(item, field) != getattr(item, 'actual_' + field)
+            )
+            self.stdout.write(f'{label} {item.pk}: {changes}')
+        self.stdout.write(f'{summary}: {total}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Reindexes the text of all posts and comments for search'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Full-text search needs SQLite with FTS5')
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import directory
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the ranking table of the author directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Rows per INSERT',
+        )
+
+    def handle(self, *args, **options):
+        total = directory.refresh(options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Author directory refreshed: {total} authors')
+        )
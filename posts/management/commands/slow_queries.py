@@ -0,0 +1,88 @@
+import glob
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'max': lambda group: group['max_ms'],
+    'count': lambda group: group['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Summarizes the slow query log grouped by statement fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=settings.SLOW_QUERY_LOG_FILE,
+            help='Slow query log, rotated backups are read too',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Number of statements to show',
+        )
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total',
+            help='Order statements by total time, worst time or count',
+        )
+
+    def entries(self, path):
+        paths = sorted(glob.glob(glob.escape(path) + '.*'), reverse=True)
+        paths.append(path)
+        for name in paths:
+            try:
+                file = open(name, encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            with file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'fingerprint' in entry:
+                        yield entry
+
+    def handle(self, *args, **options):
+        groups = {}
+        for entry in self.entries(options['file']):
+            group = groups.setdefault(entry['fingerprint'], {
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': set(),
+                'worst': entry,
+            })
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            if entry['view']:
+                group['views'].add(entry['view'])
+            if entry['duration_ms'] >= group['max_ms']:
+                group['max_ms'] = entry['duration_ms']
+                group['worst'] = entry
+
+        if not groups:
+            raise CommandError(f'No slow queries in {options["file"]}')
+
+        ordered = sorted(
+            groups.items(), key=lambda item: SORT_KEYS[options['sort']](
+                item[1]
+            ), reverse=True
+        )
+        for fingerprint, group in ordered[:options['limit']]:
+            worst = group['worst']
+            self.stdout.write(self.style.WARNING(
+                f'{fingerprint}: {group["count"]} times, '
+                f'total {group["total_ms"]:.1f} ms, '
+                f'avg {group["total_ms"] / group["count"]:.1f} ms, '
+                f'max {group["max_ms"]:.1f} ms'
+            ))
+            self.stdout.write(
+                f'  views: {", ".join(sorted(group["views"])) or "-"}'
+            )
+            self.stdout.write(f'  sql: {worst["sql"]}')
+            self.stdout.write(f'  params: {worst["params"]}')
+            for step in worst.get('plan') or ():
+                self.stdout.write(f'  plan: {step}')
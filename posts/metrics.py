@@ -0,0 +1,298 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+_missing = object()
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+class Histogram:
+    """
+    Prometheus histogram aggregated in this process
+    """
+    def __init__(self, name, documentation, buckets, labels=('view',)):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][position] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            }
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            bounds = [*map(repr, self.buckets), '+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _labels(self.labels, label_values, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {total!r}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Counter:
+    """
+    Prometheus counter aggregated in this process
+    """
+    def __init__(self, name, documentation, labels=('view',)):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._series[label_values] = (
+                self._series.get(label_values, 0) + amount
+            )
+
+    def series(self):
+        """
+        Current values by the tuples of label values
+        """
+        with self._lock:
+            return dict(self._series)
+
+    def expose(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter',
+        ]
+        for label_values, value in sorted(self.series().items()):
+            labels = _labels(self.labels, label_values)
+            lines.append(f'{self.name}{labels} {value}')
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUEST_SECONDS = register(Histogram(
+    'yatube_request_duration_seconds',
+    'Time spent handling requests',
+    LATENCY_BUCKETS,
+))
+DB_QUERIES = register(Histogram(
+    'yatube_db_queries_per_request',
+    'Database queries made by one request',
+    QUERY_COUNT_BUCKETS,
+))
+DB_SECONDS = register(Histogram(
+    'yatube_db_duration_seconds',
+    'Time one request spent in database queries',
+    LATENCY_BUCKETS,
+))
+TEMPLATE_SECONDS = register(Histogram(
+    'yatube_template_render_seconds',
+    'Time one request spent rendering templates',
+    LATENCY_BUCKETS,
+))
+CACHE_LOOKUPS = register(Counter(
+    'yatube_cache_lookups_total',
+    'Cache keys looked up, by result',
+    labels=('view', 'result'),
+))
+
+
+def current():
+    """
+    Counters of the request handled by this thread, None outside requests
+    """
+    return getattr(_local, 'state', None)
+
+
+def _record(field, amount):
+    state = current()
+    if state is not None and not getattr(_local, 'muted', False):
+        state[field] += amount
+
+
+@contextmanager
+def _muted():
+    # Backends may build get_many() on get(), keys must be counted once
+    _local.muted = True
+    try:
+        yield
+    finally:
+        _local.muted = False
+
+
+def _record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state = current()
+        if state is not None:
+            state['queries'] += 1
+            state['db_seconds'] += time.perf_counter() - started
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+class MetricsMiddleware:
+    """
+    Records latency, queries, cache lookups and template time per view
+
+    Everything is aggregated in memory of the process, the cost of one
+    request is a few counters and one lock per metric.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.state = {
+            'request': request,
+            'queries': 0,
+            'db_seconds': 0.0,
+            'template_seconds': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+        }
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(_record_query):
+                response = self.get_response(request)
+        finally:
+            state, _local.state = _local.state, None
+        duration = time.perf_counter() - started
+
+        view = view_name(request)
+        REQUEST_SECONDS.observe(duration, view)
+        DB_QUERIES.observe(state['queries'], view)
+        DB_SECONDS.observe(state['db_seconds'], view)
+        TEMPLATE_SECONDS.observe(state['template_seconds'], view)
+        if state['cache_hits']:
+            CACHE_LOOKUPS.inc(state['cache_hits'], view, 'hit')
+        if state['cache_misses']:
+            CACHE_LOOKUPS.inc(state['cache_misses'], view, 'miss')
+        return response
+
+
+class InstrumentedCacheMixin:
+    """
+    Counts hits and misses of a cache backend for the current request
+    """
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            _record('cache_misses', 1)
+            return default
+        _record('cache_hits', 1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with _muted():
+            values = super().get_many(keys, version)
+        _record('cache_hits', len(values))
+        _record('cache_misses', len(keys) - len(values))
+        return values
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            _record('template_seconds', time.perf_counter() - started)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Django template engine recording render time of the current request
+    """
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def expose():
+    """
+    All metrics in the Prometheus text format
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(
+        expose(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,60 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+
+    def count_of(model, field):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(**{field: OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(total=Count('pk'))
+                .values('total')
+            ),
+            0
+        )
+
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=user_id)
+        for user_id in User.objects.values_list('id', flat=True)
+    )
+    AuthorStats.objects.update(
+        followers_count=count_of(Follow, 'author'),
+        following_count=count_of(Follow, 'user'),
+        posts_count=count_of(Post, 'author'),
+        likes_count=count_of(Like, 'post__author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_first_name_index'),
+        ('posts', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('followers_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписок')),
+                ('posts_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество записей')),
+                ('likes_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество полученных лайков')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+
+def fill_directory(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorRank = apps.get_model('posts', 'AuthorRank')
+    Post = apps.get_model('posts', 'Post')
+
+    last_post = Post.objects.filter(
+        author=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    users = User.objects.annotate(
+        followers=Coalesce(F('stats__followers_count'), 0),
+        activity=Coalesce(Subquery(last_post), F('date_joined')),
+    ).annotate(
+        by_followers=Window(
+            RowNumber(), order_by=[F('followers').desc(), F('id').asc()]
+        ),
+        by_activity=Window(
+            RowNumber(), order_by=[F('activity').desc(), F('id').asc()]
+        ),
+        by_name=Window(
+            RowNumber(), order_by=[
+                F('first_name').asc(), F('last_name').asc(),
+                F('username').asc(), F('id').asc(),
+            ]
+        ),
+    ).order_by()
+    AuthorRank.objects.bulk_create(
+        AuthorRank(
+            user_id=user.id,
+            followers_count=user.followers,
+            last_activity=user.activity,
+            by_followers=user.by_followers,
+            by_activity=user.by_activity,
+            by_name=user.by_name,
+        )
+        for user in users
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_first_name_index'),
+        ('posts', '0007_author_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorRank',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+                ('last_activity', models.DateTimeField(verbose_name='Последняя активность')),
+                ('by_followers', models.PositiveIntegerField(unique=True, verbose_name='Место по подписчикам')),
+                ('by_activity', models.PositiveIntegerField(unique=True, verbose_name='Место по активности')),
+                ('by_name', models.PositiveIntegerField(unique=True, verbose_name='Место по имени')),
+            ],
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
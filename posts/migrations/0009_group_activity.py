@@ -0,0 +1,54 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_activity(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.filter(group=OuterRef('pk')).order_by()
+
+    Group.objects.update(
+        posts_count=Coalesce(
+            Subquery(
+                posts.values('group')
+                .annotate(total=Count('pk'))
+                .values('total')
+            ),
+            0
+        ),
+        last_post_at=Subquery(
+            posts.order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_author_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата последней записи'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество записей'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-last_post_at', '-id'], name='group_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-posts_count', '-id'], name='group_posts_count_idx'),
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,44 @@
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import Exists, OuterRef
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 
 User = get_user_model()
 
 
+def count_related(model, field='post'):
+    """
+    Correlated COUNT of ``model`` rows pointing at the outer row
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def last_post_date(field):
+    """
+    Correlated publication date of the newest post pointing at the outer row
+    """
+    return Subquery(
+        Post.objects.filter(**{field: OuterRef('pk')})
+        .order_by('-pub_date')
+        .values('pub_date')[:1]
+    )
+
+
 class PostQuerySet(models.QuerySet):
     def annotate_like(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                liked=Value(False, output_field=models.BooleanField())
+            )
         return self.annotate(
             liked=Exists(
                 Like.objects.filter(
@@ -15,6 +47,55 @@ class PostQuerySet(models.QuerySet):
             )
         )
 
+    def for_feed(self, user):
+        """
+        Render-ready posts for feeds: author, group and like state of
+        the viewer are fetched together with the posts themselves
+        """
+        return self.select_related('author', 'group').annotate_like(user)
+
+    def annotate_actual_counters(self):
+        return self.annotate(
+            actual_likes_count=count_related(Like),
+            actual_comments_count=count_related(Comment),
+        )
+
+
+class AuthorStatsQuerySet(models.QuerySet):
+    def actual_counters(self):
+        """
+        Expressions counting the statistics from the source tables
+        """
+        return {
+            'followers_count': count_related(Follow, 'author'),
+            'following_count': count_related(Follow, 'user'),
+            'posts_count': count_related(Post, 'author'),
+            'likes_count': count_related(Like, 'post__author'),
+        }
+
+    def annotate_actual_counters(self):
+        return self.annotate(**{
+            f'actual_{field}': expression
+            for field, expression in self.actual_counters().items()
+        })
+
+
+class GroupQuerySet(models.QuerySet):
+    def actual_counters(self):
+        """
+        Expressions computing the activity data from the posts table
+        """
+        return {
+            'posts_count': count_related(Post, 'group'),
+            'last_post_at': last_post_date('group'),
+        }
+
+    def annotate_actual_counters(self):
+        return self.annotate(**{
+            f'actual_{field}': expression
+            for field, expression in self.actual_counters().items()
+        })
+
 
 class Group(models.Model):
     """
@@ -35,6 +116,30 @@ class Group(models.Model):
         verbose_name='Описание группы',
         help_text='Это краткое описание группы'
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество записей',
+        default=0,
+        editable=False
+    )
+    last_post_at = models.DateTimeField(
+        verbose_name='Дата последней записи',
+        blank=True,
+        null=True,
+        editable=False
+    )
+
+    objects = GroupQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title'], name='group_title_idx'),
+            models.Index(
+                fields=['-last_post_at', '-id'], name='group_activity_idx'
+            ),
+            models.Index(
+                fields=['-posts_count', '-id'], name='group_posts_count_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -72,11 +177,32 @@ class Post(models.Model):
         blank=True,
         null=True
     )
+    likes_count = models.PositiveIntegerField(
+        verbose_name='Количество лайков',
+        default=0,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     objects = PostQuerySet().as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_feed_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -109,6 +235,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'], name='comment_post_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'<{self.author}> -> {self.text[:20]}'
@@ -134,11 +265,37 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
 
 
+class LikeQuerySet(models.QuerySet):
+    def toggle(self, user, post):
+        """
+        Flips the like of the user on the post, returns the new state
+
+        The (user, post) pair is unique, so the like is deleted when it
+        exists and inserted otherwise, without a separate existence check.
+        A concurrent insert of the same like counts as set.
+        """
+        with transaction.atomic():
+            deleted, _ = self.filter(user=user, post=post).delete()
+            if deleted:
+                return False
+            try:
+                with transaction.atomic():
+                    self.create(user=user, post=post)
+            except IntegrityError:
+                pass
+            return True
+
+
 class Like(models.Model):
     user = models.ForeignKey(
         User,
@@ -153,12 +310,137 @@ class Like(models.Model):
         related_name='likes'
     )
 
+    objects = LikeQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'post'], name='unique post'
             )
         ]
+        indexes = [
+            models.Index(fields=['post', 'user'], name='like_post_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} поставил лайк посту {self.post.id}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Create model for posts delivered to the follow feed of a subscriber
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост в ленте',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор поста',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique timeline post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_feed_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'Пост {self.post_id} в ленте {self.user_id}'
+
+
+class AuthorStats(models.Model):
+    """
+    Create model for cached statistics of the author shown on profile cards
+    """
+    user = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0,
+        editable=False
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество записей',
+        default=0,
+        editable=False
+    )
+    likes_count = models.PositiveIntegerField(
+        verbose_name='Количество полученных лайков',
+        default=0,
+        editable=False
+    )
+
+    objects = AuthorStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f'Статистика автора {self.user_id}'
+
+
+class AuthorRank(models.Model):
+    """
+    Create model for the precomputed author directory
+
+    Every sort order of the directory is stored as a unique position,
+    so any page is one range scan of an index
+    """
+    user = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank'
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0
+    )
+    last_activity = models.DateTimeField(
+        verbose_name='Последняя активность'
+    )
+    by_followers = models.PositiveIntegerField(
+        verbose_name='Место по подписчикам',
+        unique=True
+    )
+    by_activity = models.PositiveIntegerField(
+        verbose_name='Место по активности',
+        unique=True
+    )
+    by_name = models.PositiveIntegerField(
+        verbose_name='Место по имени',
+        unique=True
+    )
+
+    def __str__(self):
+        return f'Автор {self.user_id} в каталоге'
@@ -0,0 +1,228 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+import posts.settings as addition_settings
+
+from . import metrics
+from .generations import GLOBAL, generations, scope
+from .models import Comment, Post
+
+PAGE_KEY = 'posts:page:{}'
+CONDITIONAL_KEY = 'posts:conditional:{}'
+
+EVENTS = {'hit': 'hits', 'miss': 'misses', 'store': 'stores'}
+
+PAGE_CACHE_EVENTS = metrics.register(metrics.Counter(
+    'yatube_page_cache_events_total',
+    'Anonymous pages served from, missed in and stored in the page cache',
+    labels=('view', 'event'),
+))
+
+
+def _count(request, event):
+    PAGE_CACHE_EVENTS.inc(1, metrics.view_name(request), event)
+
+
+def page_cache_stats():
+    """
+    Hits, misses and stores of the page cache in this process, all views
+    """
+    stats = dict.fromkeys(EVENTS.values(), 0)
+    for (view, event), value in PAGE_CACHE_EVENTS.series().items():
+        stats[EVENTS[event]] += value
+    return stats
+
+
+def item_scopes(item):
+    """
+    Cache scopes whose change makes a rendered post or comment stale
+    """
+    if isinstance(item, Comment):
+        return [scope('author', item.author_id)]
+    scopes = [scope('post', item.id), scope('author', item.author_id)]
+    if item.group_id:
+        scopes.append(scope('group', item.group_id))
+    return scopes
+
+
+def user_scopes(user_id):
+    """
+    Cache scopes of every page showing the name or the avatar of the user
+
+    Besides the profile, the user is shown on pages keyed on other scopes:
+    the feeds, the groups the user posted to and the comments of the posts
+    the user commented on.
+    """
+    group_ids = Post.objects.filter(
+        author=user_id, group__isnull=False
+    ).order_by().values_list('group', flat=True).distinct()
+    post_ids = Comment.objects.filter(
+        author=user_id
+    ).order_by().values_list('post', flat=True).distinct()
+    return [
+        GLOBAL,
+        scope('author', user_id),
+        *(scope('group', group_id) for group_id in group_ids),
+        *(scope('post', post_id) for post_id in post_ids),
+    ]
+
+
+def tag(request, *scopes, page=None):
+    """
+    Tags the cached response of the request with the scopes it shows
+
+    The entrance accepts:
+        ~ scopes - scopes of the whole page (global, group, author, post)
+        ~ page - page of posts or comments, each of them adds its own tags
+    """
+    tags = getattr(request, 'page_cache_tags', None)
+    if tags is None:
+        return
+    tags['scopes'].update(scopes)
+    if page is not None:
+        tags['pages'].append(page)
+
+
+def _collect(tags):
+    scopes = set(tags['scopes'])
+    for page in tags['pages']:
+        # A page rendered from fragments is not queried just for its tags,
+        # the fragments are keyed on the scopes of the whole page
+        if not getattr(page, 'loaded', True):
+            continue
+        for item in page:
+            scopes.update(item_scopes(item))
+    return sorted(scopes)
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def cache_anonymous_page(view):
+    """
+    Caches whole responses of the view for anonymous users
+
+    A cached page is served while the generations of all its tags are the
+    same as at the moment it was rendered, so a write bumping one of them
+    purges exactly the pages showing the changed objects.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or (
+            request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+
+        path = request.get_full_path().encode()
+        key = PAGE_KEY.format(hashlib.md5(path).hexdigest())
+        entry = cache.get(key)
+        if entry is not None:
+            tags, version, content, content_type = entry
+            if generations(*tags) == version:
+                _count(request, 'hit')
+                tag(request, *tags)
+                return HttpResponse(content, content_type=content_type)
+        _count(request, 'miss')
+
+        request.page_cache_tags = {'scopes': set(), 'pages': []}
+        response = view(request, *args, **kwargs)
+        if _cacheable(request, response) and (
+            request.page_cache_tags['scopes']
+        ):
+            tags = _collect(request.page_cache_tags)
+            cache.set(
+                key,
+                (tags, generations(*tags), response.content,
+                 response['Content-Type']),
+                addition_settings.PAGE_CACHE_TTL
+            )
+            _count(request, 'store')
+        return response
+
+    return wrapper
+
+
+def _etag(request, viewer, version):
+    # Pages carry the CSRF token of the viewer, it is rotated on login
+    token = request.META.get('CSRF_COOKIE', '')
+    raw = f'{viewer}:{token}:{version}'.encode()
+    return quote_etag(hashlib.md5(raw).hexdigest())
+
+
+def _stamp(request, response, etag, modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    patch_cache_control(
+        response, no_cache=True, private=request.user.is_authenticated
+    )
+    return response
+
+
+def conditional_page(view):
+    """
+    Answers repeated GET requests of the view with 304 Not Modified
+
+    The ETag of a page is made of the generations of the scopes the view
+    tagged it with, of the viewer and of the CSRF token of the viewer,
+    so a page with a form holding a rotated token is never reused. The
+    scopes are remembered per url and viewer, so revalidating an unchanged
+    page costs a few cache lookups: no post queries and no template
+    rendering. Last-Modified is the moment the generations were first
+    seen with these values.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        viewer = request.user.pk if request.user.is_authenticated else None
+        path = f'{viewer}:{request.get_full_path()}'.encode()
+        key = CONDITIONAL_KEY.format(hashlib.md5(path).hexdigest())
+        entry = cache.get(key)
+        if entry is not None:
+            scopes, version, modified = entry
+            if generations(*scopes) == version:
+                etag = _etag(request, viewer, version)
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=modified
+                )
+                if response is not None:
+                    return _stamp(request, response, etag, modified)
+
+        request.page_cache_tags = {'scopes': set(), 'pages': []}
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200 or response.streaming or not (
+            request.page_cache_tags['scopes']
+        ):
+            return response
+
+        scopes = set(_collect(request.page_cache_tags))
+        if viewer is not None:
+            scopes.add(scope('author', viewer))
+        scopes = sorted(scopes)
+        version = generations(*scopes)
+        if entry is not None and entry[:2] == (scopes, version):
+            modified = entry[2]
+        else:
+            modified = int(time.time())
+            cache.set(
+                key, (scopes, version, modified),
+                addition_settings.CONDITIONAL_GET_TTL
+            )
+        return _stamp(
+            request, response, _etag(request, viewer, version), modified
+        )
+
+    return wrapper
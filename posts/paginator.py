@@ -0,0 +1,281 @@
+import base64
+import hashlib
+import json
+import math
+from collections.abc import Sequence
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+
+import posts.settings as addition_settings
+
+
+def encode_cursor(values):
+    """
+    Packs values of the ordering columns into an opaque url-safe string
+    """
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """
+    Unpacks a cursor made by encode_cursor, returns None if it is broken
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+class KeysetPage(Sequence):
+    """
+    One page of a KeysetPaginator
+
+    Supports the part of django.core.paginator.Page used by templates,
+    links to the neighbour pages are built from cursors instead of numbers.
+    The page is loaded on first access, so a page whose rendering is served
+    from a fragment cache costs no query at all.
+    """
+    def __init__(self, paginator, query):
+        self.paginator = paginator
+        self.query = query
+
+    def __repr__(self):
+        position = ''.join(
+            f' {key}={self.query[key]}' for key in ('after', 'before', 'page')
+            if self.query.get(key)
+        )
+        return f'<Page{position}>'
+
+    @cached_property
+    def _loaded(self):
+        return self.paginator.load(self.query)
+
+    @property
+    def loaded(self):
+        """
+        Whether the objects of the page were queried already
+        """
+        return '_loaded' in self.__dict__
+
+    @property
+    def object_list(self):
+        return self._loaded['object_list']
+
+    @property
+    def number(self):
+        return self._loaded['number']
+
+    @property
+    def next_cursor(self):
+        return self._loaded['next_cursor']
+
+    @property
+    def previous_cursor(self):
+        return self._loaded['previous_cursor']
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _page_query(self, direction, cursor, number):
+        query = self.query.copy()
+        for key in ('after', 'before', 'page'):
+            query.pop(key, None)
+        query[direction] = cursor
+        query['page'] = number
+        return query.urlencode()
+
+    def next_page_query(self):
+        return self._page_query('after', self.next_cursor, self.number + 1)
+
+    def previous_page_query(self):
+        return self._page_query(
+            'before', self.previous_cursor, max(self.number - 1, 1)
+        )
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by a cursor over its ordering columns
+
+    Pages are selected with WHERE on the ordering columns of the boundary
+    row instead of OFFSET and no COUNT(*) is needed to render them, so a
+    deep page costs the same as the first one. The last column of the
+    ordering must be unique (usually the primary key). Ordering columns
+    may span relations, e.g. 'timeline__pub_date'.
+    """
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.attributes = [
+            f'keyset_{position}' if LOOKUP_SEP in name else name
+            for position, (name, descending) in enumerate(self.ordering)
+        ]
+        self.show_page_bar = addition_settings.FEED_PAGE_BAR
+
+    @cached_property
+    def count(self):
+        """
+        Exact number of objects, costs a COUNT(*) over the whole queryset
+        """
+        return self.object_list.count()
+
+    @cached_property
+    def estimated_count(self):
+        """
+        Number of objects cached for a while, used by the page bar only
+        """
+        sql = str(self.object_list.query).encode()
+        key = 'posts:paginator:count:' + hashlib.md5(sql).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.count
+            cache.set(key, count, addition_settings.FEED_COUNT_ESTIMATE_TTL)
+        return count
+
+    @cached_property
+    def estimated_num_pages(self):
+        return max(math.ceil(self.estimated_count / self.per_page), 1)
+
+    def _order_by(self, reverse=False):
+        return [
+            f'-{attribute}' if descending != reverse else attribute
+            for attribute, (name, descending)
+            in zip(self.attributes, self.ordering)
+        ]
+
+    def _cursor_of(self, item):
+        return encode_cursor(
+            getattr(item, attribute) for attribute in self.attributes
+        )
+
+    def _field(self, name):
+        model = self.object_list.model
+        *relations, name = name.split(LOOKUP_SEP)
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor or '')
+        if values is None or len(values) != len(self.ordering):
+            return None
+        try:
+            return [
+                self._field(name).to_python(value)
+                for (name, descending), value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            return None
+
+    def _seek(self, values, reverse=False):
+        """
+        Condition selecting rows that follow the given ones in the ordering
+        """
+        condition = Q()
+        for position, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{
+                f'{self.attributes[position]}__{lookup}': values[position]
+            })
+            for prev_attribute, prev_value in zip(
+                self.attributes[:position], values
+            ):
+                step &= Q(**{prev_attribute: prev_value})
+            condition |= step
+        return condition
+
+    def _fetch(self, values=None, reverse=False):
+        queryset = self.object_list.annotate(**{
+            attribute: F(name)
+            for attribute, (name, descending)
+            in zip(self.attributes, self.ordering)
+            if attribute != name
+        })
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        items = list(queryset[:self.per_page + 1])
+        return items[:self.per_page], len(items) > self.per_page
+
+    def _page(self, items, number, next_cursor=None, previous_cursor=None):
+        return {
+            'object_list': items,
+            'number': number,
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+        }
+
+    def _first_page(self):
+        items, has_more = self._fetch()
+        return self._page(
+            items, 1,
+            next_cursor=self._cursor_of(items[-1]) if has_more else None,
+        )
+
+    def load(self, query):
+        """
+        Fetches the page described by GET parameters of the request
+        """
+        try:
+            number = max(int(query.get('page', 1)), 2)
+        except (TypeError, ValueError):
+            number = 2
+
+        after = self._parse(query.get('after'))
+        if after is not None:
+            items, has_more = self._fetch(after)
+            return self._page(
+                items, number,
+                next_cursor=self._cursor_of(items[-1]) if has_more else None,
+                previous_cursor=(
+                    self._cursor_of(items[0]) if items
+                    else query.get('after')
+                ),
+            )
+
+        before = self._parse(query.get('before'))
+        if before is not None:
+            items, has_more = self._fetch(before, reverse=True)
+            if has_more:
+                items.reverse()
+                return self._page(
+                    items, number,
+                    next_cursor=self._cursor_of(items[-1]),
+                    previous_cursor=self._cursor_of(items[0]),
+                )
+
+        return self._first_page()
+
+    def get_page(self, query):
+        """
+        Returns the page described by GET parameters of the request
+
+        The entrance accepts:
+            ~ query - QueryDict with optional 'after' or 'before' cursor
+              and the page number used only for display
+        """
+        return KeysetPage(self, query)
@@ -0,0 +1,227 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+import posts.settings as addition_settings
+
+from .models import Post
+from .paginator import KeysetPage, decode_cursor, encode_cursor
+
+# Indexes are external-content FTS5 tables kept in sync by triggers, so raw
+# SQL and bulk writes are indexed too. SQLite drops the triggers together
+# with the table when a migration remakes posts_post or posts_comment,
+# such a migration has to call install() again.
+INDEXES = (
+    # (FTS table, content table)
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+TABLE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "text, content='{table}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+TRIGGERS_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {table} "
+    "BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END",
+)
+DROP_TRIGGERS_SQL = (
+    'DROP TRIGGER IF EXISTS {fts}_ai',
+    'DROP TRIGGER IF EXISTS {fts}_ad',
+    'DROP TRIGGER IF EXISTS {fts}_au',
+)
+DROP_SQL = DROP_TRIGGERS_SQL + ('DROP TABLE IF EXISTS {fts}',)
+
+RANKED_SQL = (
+    'SELECT post_id, MIN(rank) AS best FROM ('
+    'SELECT rowid AS post_id, bm25(posts_post_fts) AS rank '
+    'FROM posts_post_fts WHERE posts_post_fts MATCH %s '
+    'UNION ALL '
+    'SELECT c.post_id, bm25(posts_comment_fts) * %s '
+    'FROM posts_comment_fts '
+    'INNER JOIN posts_comment c ON c.id = posts_comment_fts.rowid '
+    'WHERE posts_comment_fts MATCH %s'
+    ') GROUP BY post_id {having} ORDER BY best {order}, post_id {order} '
+    'LIMIT %s'
+)
+
+
+def available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """
+    Creates the FTS5 tables with their sync triggers if they are missing
+    """
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        for fts, table in INDEXES:
+            cursor.execute(TABLE_SQL.format(fts=fts, table=table))
+            for sql in TRIGGERS_SQL:
+                cursor.execute(sql.format(fts=fts, table=table))
+
+
+def uninstall(using=connection):
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        for fts, table in INDEXES:
+            for sql in DROP_SQL:
+                cursor.execute(sql.format(fts=fts))
+
+
+def drop_triggers(using=connection):
+    """
+    Stops syncing the index, what is indexed already stays searchable
+
+    Rows written meanwhile are not indexed until rebuild(), install()
+    brings the triggers back.
+    """
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        for fts, table in INDEXES:
+            for sql in DROP_TRIGGERS_SQL:
+                cursor.execute(sql.format(fts=fts))
+
+
+def rebuild(using=connection):
+    """
+    Reindexes all posts and comments from their tables
+    """
+    install(using)
+    with using.cursor() as cursor:
+        for fts, table in INDEXES:
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+
+
+def match_expression(text):
+    """
+    Turns user input into a safe FTS5 query
+
+    Every word is quoted, so FTS5 syntax in the input is never interpreted,
+    a trailing * keeps the word a prefix query. All words must match.
+    """
+    terms = []
+    for word, star in re.findall(r'(\w+)(\*?)', text):
+        terms.append(f'"{word}"{star}')
+    return ' '.join(terms)
+
+
+class RawSubquery(RawSQL):
+    """
+    RawSQL for the right side of __in lookups
+
+    The lookup puts the subquery in parentheses itself, SQLite reads a
+    subquery in two pairs of them as a scalar: only its first row.
+    """
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def post_ids_matching(text):
+    """
+    Subquery of ids of the posts whose own text matches the query
+    """
+    return RawSubquery(
+        'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+        (match_expression(text),)
+    )
+
+
+class SearchPaginator:
+    """
+    Keyset pagination over posts ranked by relevance
+
+    A post is ranked by the best bm25 score of its own text and of its
+    comments, comments weigh less than the post itself.
+    """
+    show_page_bar = False
+
+    def __init__(self, text, user, per_page):
+        self.match = match_expression(text)
+        self.user = user
+        self.per_page = int(per_page)
+
+    def _ranked(self, cursor=None, reverse=False):
+        having, params = '', []
+        if cursor is not None:
+            sign = '<' if reverse else '>'
+            having = (
+                f'HAVING best {sign} %s OR (best = %s AND post_id {sign} %s)'
+            )
+            params = [cursor[0], cursor[0], cursor[1]]
+        sql = RANKED_SQL.format(
+            having=having, order='DESC' if reverse else 'ASC'
+        )
+        with connection.cursor() as db:
+            db.execute(sql, [
+                self.match,
+                addition_settings.SEARCH_COMMENT_WEIGHT,
+                self.match,
+                *params,
+                self.per_page + 1,
+            ])
+            rows = db.fetchall()
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor or '')
+        if values is None or len(values) != 2:
+            return None
+        try:
+            return float(values[0]), int(values[1])
+        except ValueError:
+            return None
+
+    def _page(self, rows, number, has_next, has_previous):
+        posts = Post.objects.for_feed(self.user).in_bulk(
+            [post_id for post_id, rank in rows]
+        )
+        cursors = [encode_cursor((rank, post_id)) for post_id, rank in rows]
+        return {
+            'object_list': [
+                posts[post_id] for post_id, rank in rows if post_id in posts
+            ],
+            'number': number,
+            'next_cursor': cursors[-1] if has_next else None,
+            'previous_cursor': cursors[0] if has_previous else None,
+        }
+
+    def load(self, query):
+        if not self.match or not available():
+            return self._page([], 1, False, False)
+        try:
+            number = max(int(query.get('page', 1)), 2)
+        except (TypeError, ValueError):
+            number = 2
+
+        after = self._parse(query.get('after'))
+        if after is not None:
+            rows, has_more = self._ranked(after)
+            return self._page(rows, number, has_more, bool(rows))
+
+        before = self._parse(query.get('before'))
+        if before is not None:
+            rows, has_more = self._ranked(before, reverse=True)
+            if has_more:
+                return self._page(rows[::-1], number, True, True)
+
+        rows, has_more = self._ranked()
+        return self._page(rows, 1, has_more, False)
+
+    def get_page(self, query):
+        return KeysetPage(self, query)
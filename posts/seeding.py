@@ -0,0 +1,269 @@
+import datetime as dt
+import itertools
+import json
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import signals
+from django.utils import timezone
+
+import posts.settings as addition_settings
+
+from . import search
+from .models import Comment, Follow, Group, Like, Post
+
+User = get_user_model()
+
+SPREAD = 365 * 24 * 60 * 60
+WORDS = (
+    'море', 'город', 'кошка', 'собака', 'утро', 'вечер', 'дождь', 'солнце',
+    'книга', 'музыка', 'поезд', 'горы', 'лес', 'река', 'кофе', 'работа',
+    'отпуск', 'друзья', 'фильм', 'снег', 'весна', 'осень', 'дорога', 'дом',
+)
+MODELS = {
+    'user': User,
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+    'like': Like,
+}
+MODEL_SIGNALS = (
+    signals.pre_save, signals.post_save,
+    signals.pre_delete, signals.post_delete,
+    signals.m2m_changed,
+)
+
+
+@contextmanager
+def signals_disabled(*model_signals):
+    """
+    Mutes the receivers of model signals of the whole process
+
+    The entrance accepts:
+        ~ model_signals - signals to mute, all model signals by default
+    """
+    muted = [
+        (signal, signal.receivers)
+        for signal in model_signals or MODEL_SIGNALS
+    ]
+    for signal, receivers in muted:
+        signal.receivers = []
+        signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in muted:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+
+
+@contextmanager
+def keep_dates(*models):
+    """
+    Lets bulk_create store given dates in auto_now_add fields
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def load(model, objects, chunk_size=None):
+    """
+    Inserts objects chunk by chunk, returns how many were processed
+
+    Rows violating unique constraints are skipped, so the objects may be
+    fed from an iterator of any size with flat memory.
+    """
+    chunk_size = chunk_size or addition_settings.BULK_LOAD_CHUNK_SIZE
+    objects = iter(objects)
+    total = 0
+    while True:
+        chunk = list(itertools.islice(objects, chunk_size))
+        if not chunk:
+            return total
+        model.objects.bulk_create(chunk, ignore_conflicts=True)
+        total += len(chunk)
+
+
+def run(batches, chunk_size=None, report=None):
+    """
+    Loads (model, objects) batches with model signals muted
+
+    The sync triggers of the search index are dropped for the load, so
+    inserted rows are not indexed one by one; rows indexed before stay
+    searchable and rebuild_derived() indexes the loaded ones in one pass.
+
+    The entrance accepts:
+        ~ batches - iterable of (model, iterable of unsaved objects)
+        ~ chunk_size - rows per INSERT transaction
+        ~ report - callable(model, rows, seconds) called after each batch
+    """
+    search.drop_triggers()
+    try:
+        with signals_disabled(), keep_dates(Post, Comment):
+            for model, objects in batches:
+                started = time.perf_counter()
+                rows = load(model, objects, chunk_size)
+                if report is not None:
+                    report(model, rows, time.perf_counter() - started)
+    finally:
+        search.install()
+
+
+def _ids(model):
+    return array('q', model.objects.values_list('id', flat=True).iterator())
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def generate(users=200, groups=20, posts=5000, comments=10000, likes=20000,
+             follows=4000, random_seed=0):
+    """
+    Batches of random interlinked rows for run()
+
+    Ids of the parents are read when the batch of children is reached,
+    so the batches must be loaded in order. Duplicate follows and likes
+    are generated now and then and skipped by the load, so their totals
+    can be a bit lower than requested.
+    """
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    password = make_password('benchmark')
+
+    def date():
+        return now - dt.timedelta(seconds=rng.randint(0, SPREAD))
+
+    yield User, (
+        User(
+            username=f'bench_{number}',
+            first_name=f'Автор {number}',
+            password=password,
+        )
+        for number in range(users)
+    )
+    yield Group, (
+        Group(
+            title=f'Группа {number}',
+            slug=f'bench-group-{number}',
+            description=_sentence(rng, 8),
+        )
+        for number in range(groups)
+    )
+    user_ids = _ids(User)
+    group_ids = list(_ids(Group)) + [None]
+
+    yield Post, (
+        Post(
+            text=_sentence(rng, rng.randint(5, 60)),
+            author_id=rng.choice(user_ids),
+            group_id=rng.choice(group_ids),
+            pub_date=date(),
+        )
+        for _ in range(posts)
+    )
+    post_ids = _ids(Post)
+
+    yield Comment, (
+        Comment(
+            post_id=rng.choice(post_ids),
+            author_id=rng.choice(user_ids),
+            text=_sentence(rng, rng.randint(2, 20)),
+            created=date(),
+        )
+        for _ in range(comments)
+    )
+    yield Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in (
+            (rng.choice(user_ids), rng.choice(user_ids))
+            for _ in range(follows)
+        )
+        if user_id != author_id
+    )
+    yield Like, (
+        Like(user_id=rng.choice(user_ids), post_id=rng.choice(post_ids))
+        for _ in range(likes)
+    )
+
+
+def _build(model, fields, defaults):
+    for name, value in defaults.items():
+        fields.setdefault(name, value)
+    try:
+        return model(**fields)
+    except TypeError as error:
+        raise ValueError(f'Bad {model.__name__} row: {error}')
+
+
+def read_jsonl(lines):
+    """
+    Batches of objects from JSON lines for run()
+
+    Every line is an object with the model name under 'model' and the
+    column values, e.g. {"model": "post", "id": 1, "author_id": 2, ...}.
+    Consecutive lines of the same model make one batch, so parents have
+    to come before their children. Lines are parsed lazily.
+    """
+    now = timezone.now()
+    defaults = {
+        User: {'password': make_password(None)},
+        Post: {'pub_date': now},
+        Comment: {'created': now},
+    }
+
+    def rows():
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+                model = MODELS[fields.pop('model')]
+            except (ValueError, KeyError, AttributeError, TypeError):
+                raise ValueError(f'Line {number} is not a known model row')
+            yield model, fields
+
+    for model, group in itertools.groupby(rows(), key=lambda row: row[0]):
+        yield model, (
+            _build(model, fields, defaults.get(model, {}))
+            for _, fields in group
+        )
+
+
+def seed(**volumes):
+    """
+    Fills the database with random rows for benchmarks and tests
+    """
+    run(generate(**volumes))
+
+
+def rebuild_derived():
+    """
+    Rebuilds data maintained by signals after a bulk load
+
+    Counters, timelines, the search index and the author directory are
+    rebuilt, caches are dropped since any cached page may be stale now.
+    """
+    for command in (
+        'rebuild_counters', 'rebuild_timelines', 'rebuild_search_index',
+        'refresh_author_directory',
+    ):
+        call_command(command, stdout=StringIO())
+    cache.clear()
@@ -2,3 +2,35 @@ NUMBER_ITEM_PAGINATOR_POST = 10
 NUMBER_ITEM_PAGINATOR_ALL_GROUPS = 15
 NUMBER_ITEM_PAGINATOR_ALL_AUTHORS = 20
 NUMBER_ITEM_PAGINATOR_COMMENTS = 10
+FEED_PAGE_BAR = False
+FEED_COUNT_ESTIMATE_TTL = 5 * 60
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+TIMELINE_BACKFILL_LIMIT = 500
+TIMELINE_CELEBRITIES_TTL = 5 * 60
+FEED_CACHE_TTL = 60 * 60
+PAGE_CACHE_TTL = 10 * 60
+NUMBER_ITEM_PAGINATOR_SEARCH = 10
+SEARCH_COMMENT_WEIGHT = 0.5
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+POST_IMAGE_GEOMETRY = '700x339'
+COMMENT_AVATAR_GEOMETRY = '94x94'
+PROFILE_AVATAR_GEOMETRY = '540x339'
+POST_IMAGE_GEOMETRIES = (POST_IMAGE_GEOMETRY,)
+AVATAR_GEOMETRIES = (COMMENT_AVATAR_GEOMETRY, PROFILE_AVATAR_GEOMETRY)
+THUMBNAIL_WORKERS = 2
+BULK_LOAD_CHUNK_SIZE = 5000
+SLOW_QUERY_THRESHOLD_MS = 100
+# Values of the parameters hold password hashes and session keys, only
+# their types are logged unless this is switched on
+SLOW_QUERY_LOG_PARAMS = False
+NUMBER_ITEM_PAGINATOR_API = 20
+CONDITIONAL_GET_TTL = 24 * 60 * 60
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_LEVEL = 11
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_MAX_AGE = 60 * 60
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_LEVEL = 4
+RESPONSE_COMPRESS_MIN_LENGTH = 200
+SESSION_WRITE_BEHIND_SECONDS = 5 * 60
+USER_CACHE_TTL = 60 * 60
@@ -0,0 +1,230 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models import Case, DateTimeField, F, Subquery, Value, When
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import slow_queries, timeline
+from .generations import GLOBAL, bump, scope
+from .models import (
+    AuthorStats, Comment, Follow, Group, Like, Post, last_post_date
+)
+from .page_cache import user_scopes
+
+User = get_user_model()
+
+# Fields of a user shown next to the posts and comments of the user
+IDENTITY_FIELDS = ('username', 'first_name', 'last_name', 'avatar')
+
+
+def change_counter(post_id, field, delta):
+    """
+    Atomically shifts the denormalized counter of the post
+
+    The entrance accepts:
+        ~ post_id - id of the post whose counter changes
+        ~ field - name of the counter field
+        ~ delta - +1 or -1
+    """
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(**{f'{field}__gte': -delta})
+    posts.update(**{field: F(field) + delta})
+
+
+def change_stats(user_id, field, delta):
+    """
+    Atomically shifts the cached statistics of the author
+
+    The entrance accepts:
+        ~ user_id - id of the author or an expression selecting it
+        ~ field - name of the counter field
+        ~ delta - +1 or -1
+    """
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{field: F(field) + delta})
+
+
+def change_group_counter(group_id, delta, pub_date):
+    """
+    Atomically shifts the post counter of the group and its last post date
+
+    The entrance accepts:
+        ~ group_id - id of the group, nothing happens if it is None
+        ~ delta - +1 for a post added to the group, -1 for a removed one
+        ~ pub_date - publication date of that post
+    """
+    if group_id is None:
+        return
+    groups = Group.objects.filter(pk=group_id)
+    if delta > 0:
+        last_post_at = Case(
+            When(last_post_at__gte=pub_date, then=F('last_post_at')),
+            default=Value(pub_date),
+            output_field=DateTimeField(),
+        )
+    else:
+        groups = groups.filter(posts_count__gte=-delta)
+        last_post_at = last_post_date('group')
+    groups.update(
+        posts_count=F('posts_count') + delta, last_post_at=last_post_at
+    )
+
+
+def post_author(post_id):
+    return Subquery(
+        Post.objects.filter(pk=post_id).values('author_id')[:1]
+    )
+
+
+def bump_post_scopes(post_id, author_id=None, group_ids=()):
+    """
+    Invalidates cached feeds showing the post
+
+    The entrance accepts:
+        ~ post_id - id of the changed post
+        ~ author_id - id of its author, looked up if not given
+        ~ group_ids - ids of the groups the post belongs or belonged to
+    """
+    if author_id is None:
+        row = Post.objects.filter(pk=post_id).values_list(
+            'author_id', 'group_id'
+        ).first()
+        if row is None:
+            return
+        author_id, group_id = row
+        group_ids = (group_id,)
+    bump(
+        GLOBAL,
+        scope('post', post_id),
+        scope('author', author_id),
+        *(scope('group', group_id) for group_id in group_ids if group_id)
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if not instance._state.adding:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Like)
+def like_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.post_id, 'likes_count', 1)
+        change_stats(post_author(instance.post_id), 'likes_count', 1)
+    bump_post_scopes(instance.post_id)
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    change_counter(instance.post_id, 'likes_count', -1)
+    change_stats(post_author(instance.post_id), 'likes_count', -1)
+    bump_post_scopes(instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.post_id, 'comments_count', 1)
+    bump_post_scopes(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_counter(instance.post_id, 'comments_count', -1)
+    bump_post_scopes(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+        change_stats(instance.author_id, 'posts_count', 1)
+        change_group_counter(instance.group_id, 1, instance.pub_date)
+    previous_group_id = getattr(
+        instance, '_previous_group_id', instance.group_id
+    )
+    if not created and previous_group_id != instance.group_id:
+        change_group_counter(previous_group_id, -1, instance.pub_date)
+        change_group_counter(instance.group_id, 1, instance.pub_date)
+    bump_post_scopes(
+        instance.id,
+        instance.author_id,
+        (instance.group_id, previous_group_id)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_stats(instance.author_id, 'posts_count', -1)
+    change_group_counter(instance.group_id, -1, instance.pub_date)
+    bump_post_scopes(instance.id, instance.author_id, (instance.group_id,))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    bump(GLOBAL, scope('group', instance.id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+        change_stats(instance.author_id, 'followers_count', 1)
+        change_stats(instance.user_id, 'following_count', 1)
+    bump(
+        scope('author', instance.user_id),
+        scope('author', instance.author_id)
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    change_stats(instance.author_id, 'followers_count', -1)
+    change_stats(instance.user_id, 'following_count', -1)
+    bump(
+        scope('author', instance.user_id),
+        scope('author', instance.author_id)
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_identity(sender, instance, update_fields=None, **kwargs):
+    instance._previous_identity = None
+    if instance._state.adding or update_fields and not (
+        set(update_fields) & set(IDENTITY_FIELDS)
+    ):
+        return
+    instance._previous_identity = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*IDENTITY_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    previous = getattr(instance, '_previous_identity', None)
+    identity = tuple(str(getattr(instance, name)) for name in IDENTITY_FIELDS)
+    if previous is not None and previous != identity:
+        # Feeds, groups and comments show the user too, and are not keyed
+        # on the author scope
+        bump(*user_scopes(instance.id))
+    else:
+        bump(scope('author', instance.id))
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    if connection.alias == DEFAULT_DB_ALIAS:
+        slow_queries.install(connection)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+import posts.settings as addition_settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_PARAMS = 50
+MAX_PARAM_LENGTH = 200
+
+_local = threading.local()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Short id of the statement shape, the same for any parameter values
+    """
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _LIST.sub('(...)', shape)
+    shape = _SPACE.sub(' ', shape).strip()
+    return hashlib.md5(shape.encode()).hexdigest()[:12]
+
+
+def _params(params, many):
+    if params is None:
+        return None
+    if many:
+        params = next(iter(params), ())
+    params = list(params)[:MAX_PARAMS]
+    if not addition_settings.SLOW_QUERY_LOG_PARAMS:
+        return [type(value).__name__ for value in params]
+    return [str(value)[:MAX_PARAM_LENGTH] for value in params]
+
+
+def _explain(connection, sql, params, many):
+    if connection.vendor != 'sqlite':
+        return None
+    if many:
+        params = next(iter(params), None)
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'EXPLAIN failed: {error}']
+    finally:
+        _local.explaining = False
+
+
+def _caller():
+    state = metrics.current()
+    request = state and state.get('request')
+    if request is None:
+        return None, None
+    return metrics.view_name(request), request.path
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper writing slow statements to the slow query log
+    """
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        if duration >= addition_settings.SLOW_QUERY_THRESHOLD_MS:
+            view, path = _caller()
+            logger.warning('Slow query', extra={'query': {
+                'time': time.time(),
+                'duration_ms': round(duration, 3),
+                'fingerprint': fingerprint(sql),
+                'sql': sql,
+                'params': _params(params, many),
+                'many': many,
+                'view': view,
+                'path': path,
+                'plan': _explain(context['connection'], sql, params, many),
+            }})
+
+
+def install(connection):
+    """
+    Hooks the slow query log into a new database connection
+    """
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records of the slow query log as JSON lines
+    """
+    def format(self, record):
+        entry = getattr(record, 'query', None)
+        if entry is None:
+            entry = {'message': record.getMessage()}
+        return json.dumps(entry, ensure_ascii=False, default=str)
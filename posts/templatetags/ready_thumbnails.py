@@ -0,0 +1,32 @@
+from django import template
+
+from posts import thumbnails
+from posts.page_cache import tag
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def ready_thumbnail(context, file_, geometry, owner=None):
+    """
+    Thumbnail of the image if it is generated already, None otherwise
+
+    Images registered by the view with thumbnails.prefetch() are looked
+    up together in one batch.
+
+    A missing thumbnail is queued to the workers instead of being made
+    inside the request, the template shows a placeholder meanwhile. The
+    page is tagged with the scopes of the owner of the image (post or
+    user), the worker purges the pages showing it once it is ready.
+    """
+    if not file_:
+        return None
+    request = context.get('request')
+    thumbnail = thumbnails.lookup(request, file_, geometry)
+    if thumbnail is None:
+        thumbnails.enqueue(file_, (geometry,), owner)
+        thumbnail = thumbnails.ready(file_, geometry)
+    if thumbnail is None and owner is not None:
+        if request is not None:
+            tag(request, *thumbnails.image_scopes(owner))
+    return thumbnail
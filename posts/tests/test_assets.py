@@ -0,0 +1,85 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+import brotli
+from django.core.management import call_command
+from django.http import Http404
+from django.templatetags.static import static
+from django.test import RequestFactory, override_settings
+
+from posts.assets import serve
+from posts.tests.test_settings import AllSettings
+
+CSS = b'body { background: url("../img/fon.png"); }\n' * 50
+
+
+class StaticPipelineTest(AllSettings):
+    def setUp(self):
+        super().setUp()
+        source = tempfile.mkdtemp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(source, 'css'))
+        os.makedirs(os.path.join(source, 'img'))
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as file:
+            file.write(CSS)
+        with open(os.path.join(source, 'img', 'fon.png'), 'wb') as file:
+            file.write(b'png')
+        settings = override_settings(
+            STATICFILES_DIRS=[source],
+            STATIC_ROOT=root,
+            INSTALLED_APPS=['posts', 'users', 'django.contrib.staticfiles'],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('build_static', stdout=StringIO())
+
+    def test_templates_reference_hashed_names(self):
+        url = static('css/site.css')
+
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+
+    def test_hashed_files_are_served_precompressed_and_immutable(self):
+        response = self.guest_client.get(
+            static('css/site.css'), HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        content = b''.join(response.streaming_content)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(content), len(CSS))
+        self.assertIn(b'fon.', gzip.decompress(content))
+
+    def test_brotli_variant_is_preferred(self):
+        response = self.guest_client.get(
+            static('css/site.css'), HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        content = b''.join(response.streaming_content)
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertLess(len(content), len(CSS))
+        self.assertIn(b'fon.', brotli.decompress(content))
+
+    def test_plain_names_and_identity_clients(self):
+        response = self.guest_client.get(
+            '/static/css/site.css', HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_missing_and_escaping_paths(self):
+        request = RequestFactory().get('/static/')
+        for path in ('css/missing.css', '../manage.py', '/etc/passwd'):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    serve(request, path)
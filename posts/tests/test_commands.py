@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db.models import F, Q
+
+from posts import search, seeding
+from posts.management.commands.benchmark_views import compare, percentile
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Like, Post, TimelineEntry
+)
+from posts.tests.test_settings import AllSettings
+
+
+class RebuildCountersTest(AllSettings):
+    def setUp(self):
+        super().setUp()
+        Like.objects.create(user=self.user_2, post=self.post)
+        Comment.objects.create(post=self.post, author=self.user_2, text='!')
+        Post.objects.filter(pk=self.post.pk).update(
+            likes_count=7, comments_count=0
+        )
+
+    def test_check_reports_drift_without_fixing(self):
+        out = StringIO()
+        call_command('rebuild_counters', check=True, stdout=out)
+
+        self.assertIn('Posts with drifted counters: 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 7)
+
+    def test_rebuild_fixes_drift(self):
+        call_command('rebuild_counters', stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+        self.posts_follow.refresh_from_db()
+        self.assertEqual(self.posts_follow.likes_count, 0)
+
+    def test_rebuild_fixes_author_stats(self):
+        AuthorStats.objects.filter(user=self.user).update(
+            posts_count=9, likes_count=0
+        )
+        AuthorStats.objects.filter(user=self.user_3).delete()
+        out = StringIO()
+        call_command('rebuild_counters', check=True, stdout=out)
+        self.assertIn('Authors with drifted statistics: 1', out.getvalue())
+        self.assertIn('Authors without statistics: 1', out.getvalue())
+
+        call_command('rebuild_counters', stdout=StringIO())
+
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.likes_count, 1)
+        self.assertTrue(AuthorStats.objects.filter(user=self.user_3).exists())
+
+    def test_rebuild_fixes_group_counters(self):
+        Group.objects.filter(pk=self.group.pk).update(
+            posts_count=0, last_post_at=None
+        )
+        out = StringIO()
+        call_command('rebuild_counters', check=True, stdout=out)
+        self.assertIn('Groups with drifted counters: 1', out.getvalue())
+
+        call_command('rebuild_counters', stdout=StringIO())
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(self.group.last_post_at, self.post.pub_date)
+
+
+class BenchmarkTest(AllSettings):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_compare_reports_slower_and_chattier_scenarios(self):
+        baseline = {
+            'index': {'p95_ms': 10.0, 'queries': 3},
+            'groups': {'p95_ms': 10.0, 'queries': 3},
+            'profile': {'p95_ms': 10.0, 'queries': 3},
+        }
+        results = {
+            'index': {'p95_ms': 10.5, 'queries': 3},
+            'groups': {'p95_ms': 12.0, 'queries': 3},
+            'profile': {'p95_ms': 9.0, 'queries': 4},
+            'search': {'p95_ms': 1.0, 'queries': 1},
+        }
+
+        lines, regressions = compare(baseline, results, threshold=10)
+
+        self.assertEqual(regressions, ['groups', 'profile'])
+        self.assertIn('search: new scenario', lines)
+
+    def test_seed_builds_consistent_data(self):
+        seeding.seed(
+            users=5, groups=2, posts=30, comments=40, likes=50, follows=10
+        )
+        seeding.rebuild_derived()
+
+        self.assertEqual(Follow.objects.filter(user=F('author')).count(), 0)
+        self.assertTrue(0 < Like.objects.count() <= 50)
+        self.assertEqual(
+            Post.objects.annotate_actual_counters().filter(
+                ~Q(likes_count=F('actual_likes_count'))
+            ).count(),
+            0
+        )
+        self.assertGreater(TimelineEntry.objects.count(), 0)
+
+    def test_seed_leaves_indexing_to_the_rebuild(self):
+        seeding.seed(
+            users=3, groups=1, posts=10, comments=10, likes=5, follows=3
+        )
+        post = Post.objects.exclude(
+            pk__in=(self.post.pk, self.posts_follow.pk)
+        ).first()
+
+        def matching():
+            return list(Post.objects.filter(
+                id__in=search.post_ids_matching(post.text.split()[0])
+            ).values_list('id', flat=True))
+
+        self.assertNotIn(post.id, matching())
+        self.assertIn(
+            self.post.id,
+            Post.objects.filter(
+                id__in=search.post_ids_matching(self.post.text)
+            ).values_list('id', flat=True)
+        )
+        seeding.rebuild_derived()
+        self.assertIn(post.id, matching())
+
+
+class LoadDataTest(AllSettings):
+    def dump(self, rows):
+        file = tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', encoding='utf-8', delete=False
+        )
+        with file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_import_jsonl(self):
+        path = self.dump([
+            {'model': 'user', 'id': 100, 'username': 'imported'},
+            {'model': 'post', 'id': 100, 'author_id': 100, 'text': 'Импорт',
+             'pub_date': '2020-01-01T10:00:00+00:00'},
+            {'model': 'like', 'user_id': self.user.id, 'post_id': 100},
+            {'model': 'like', 'user_id': self.user.id, 'post_id': 100},
+            {'model': 'follow', 'user_id': self.user.id, 'author_id': 100},
+        ])
+        out = StringIO()
+
+        with mock.patch('posts.signals.timeline.fan_out') as fan_out:
+            call_command('load_data', source=path, stdout=out)
+
+        fan_out.assert_not_called()
+        self.assertIn('Loaded 5 rows', out.getvalue())
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.likes_count, 1)
+        self.assertFalse(post.author.has_usable_password())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    def test_broken_line_is_reported(self):
+        path = self.dump([{'model': 'planet', 'name': 'Марс'}])
+
+        with self.assertRaisesMessage(CommandError, 'Line 1'):
+            call_command('load_data', source=path, stdout=StringIO())
+
+    def test_generate(self):
+        out = StringIO()
+        call_command(
+            'load_data', users=4, groups=1, posts=20, comments=5,
+            follows=6, likes=10, stdout=out
+        )
+
+        self.assertIn('Post: 20 rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(Post.objects.count(), 22)
@@ -0,0 +1,114 @@
+import gzip
+import re
+import zlib
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from posts.compression import CompressionMiddleware
+from posts.tests.test_settings import AllSettings
+
+
+class CompressionTest(AllSettings):
+    def respond(self, response, accept='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_feed_page_is_gzipped(self):
+        plain = self.guest_client.get(reverse('posts:index'))
+        compressed = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertTrue(compressed['ETag'].startswith('W/"'))
+        self.assertLess(len(compressed.content), len(plain.content))
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        chunks = [f'<p>Пост {number}</p>'.encode() * 50 for number in range(3)]
+        consumed = []
+
+        def content():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        response = self.respond(StreamingHttpResponse(content()))
+        stream = iter(response.streaming_content)
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = decoder.decompress(next(stream))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(consumed), 1)
+        self.assertEqual(first, chunks[0])
+        rest = b''.join(decoder.decompress(data) for data in stream)
+        self.assertEqual(first + rest, b''.join(chunks))
+
+    def test_brotli_is_preferred(self):
+        plain = self.guest_client.get(reverse('posts:index'))
+        compressed = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+
+        self.assertEqual(compressed['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertLess(len(compressed.content), len(plain.content))
+        self.assertEqual(brotli.decompress(compressed.content), plain.content)
+
+    def test_streaming_response_is_brotli_flushed_per_chunk(self):
+        chunks = [f'<p>Пост {number}</p>'.encode() * 50 for number in range(3)]
+
+        response = self.respond(
+            StreamingHttpResponse(iter(chunks)), accept='br'
+        )
+        decoder = brotli.Decompressor()
+        decoded = [
+            decoder.process(data) for data in response.streaming_content
+        ]
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(decoded[:len(chunks)], chunks)
+        self.assertEqual(b''.join(decoded), b''.join(chunks))
+        self.assertTrue(decoder.is_finished())
+
+    def test_skipped_responses(self):
+        body = b'0' * 1000
+        for response in (
+            HttpResponse(body, content_type='image/png'),
+            HttpResponse(b'short'),
+            HttpResponse(body, content_type='application/zip'),
+        ):
+            with self.subTest(content_type=response['Content-Type']):
+                self.assertNotIn(
+                    'Content-Encoding', self.respond(response)
+                )
+        refused = self.respond(HttpResponse(body), accept='gzip;q=0')
+        self.assertNotIn('Content-Encoding', refused)
+        self.assertIn('Accept-Encoding', refused['Vary'])
+        svg = self.respond(HttpResponse(body, content_type='image/svg+xml'))
+        self.assertEqual(svg['Content-Encoding'], 'gzip')
+
+    def test_ratio_and_cpu_time_are_recorded(self):
+        def count(text, name):
+            match = re.search(
+                rf'^{name}_count\{{view="posts:index",encoding="gzip"\}} '
+                r'(\d+)$', text, re.MULTILINE
+            )
+            return int(match.group(1)) if match else 0
+
+        before = self.guest_client.get(reverse('metrics')).content.decode()
+        self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        after = self.guest_client.get(reverse('metrics')).content.decode()
+
+        for name in (
+            'yatube_response_compression_ratio',
+            'yatube_response_compression_cpu_seconds',
+        ):
+            self.assertEqual(count(after, name) - count(before, name), 1)
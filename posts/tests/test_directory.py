@@ -0,0 +1,74 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+
+import posts.settings as posts_settings
+from posts import directory
+from posts.models import AuthorRank, Follow
+from posts.tests.test_settings import AllSettings
+
+
+class AuthorDirectoryTest(AllSettings):
+    def setUp(self):
+        super().setUp()
+        Follow.objects.create(user=self.user, author=self.user_2)
+        Follow.objects.create(user=self.user_3, author=self.user_2)
+        Follow.objects.create(user=self.user, author=self.user_3)
+        directory.refresh()
+
+    def authors(self, query):
+        response = self.guest_client.get(reverse('posts:all_authors'), query)
+        page = response.context['page']
+        return [entry.user for entry in page], page
+
+    def test_refresh_ranks_every_sort(self):
+        ranks = {
+            rank.user_id: rank for rank in AuthorRank.objects.all()
+        }
+
+        self.assertEqual(ranks[self.user_2.id].followers_count, 2)
+        self.assertEqual(ranks[self.user_2.id].by_followers, 1)
+        self.assertEqual(ranks[self.user_3.id].by_followers, 2)
+        self.assertEqual(ranks[self.user.id].by_activity, 1)
+        self.assertEqual(ranks[self.user.id].by_name, 1)
+        self.assertEqual(
+            ranks[self.user.id].last_activity, self.post.pub_date
+        )
+
+    def test_sorts(self):
+        expected = {
+            'followers': [self.user_2, self.user_3, self.user],
+            'activity': [self.user, self.user_2, self.user_3],
+            'name': [self.user, self.user_2, self.user_3],
+            'unknown': [self.user, self.user_2, self.user_3],
+        }
+        for sort, users in expected.items():
+            with self.subTest(sort=sort):
+                self.assertEqual(self.authors({'sort': sort})[0], users)
+
+    def test_keyset_pages_keep_the_sort(self):
+        with mock.patch.object(
+            posts_settings, 'NUMBER_ITEM_PAGINATOR_ALL_AUTHORS', 2
+        ):
+            first, page = self.authors({'sort': 'followers'})
+            query = dict(
+                pair.split('=') for pair in page.next_page_query().split('&')
+            )
+            second, page = self.authors(query)
+
+        self.assertEqual(first, [self.user_2, self.user_3])
+        self.assertEqual(second, [self.user])
+        self.assertFalse(page.has_next())
+
+    def test_command_picks_up_new_authors(self):
+        Follow.objects.create(user=self.user_2, author=self.user)
+        Follow.objects.create(user=self.user_3, author=self.user)
+        Follow.objects.filter(author=self.user_2).delete()
+
+        call_command('refresh_author_directory', stdout=StringIO())
+
+        self.assertEqual(
+            self.authors({'sort': 'followers'})[0][0], self.user
+        )
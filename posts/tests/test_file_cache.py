@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from posts import file_cache
+from posts.file_cache import SQLiteCache, key_prefix
+from yatube.test_runner import private_cache
+
+
+def _add_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.worker()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def worker(self, max_bytes=1024 * 1024):
+        return SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_BYTES': max_bytes}}
+        )
+
+    def test_basic_operations(self):
+        self.cache.set('posts:page:1', {'content': b'<html>'})
+        self.cache.set_many({'a': 1, 'b': [1, 2], 'c': True})
+
+        self.assertEqual(
+            self.cache.get('posts:page:1'), {'content': b'<html>'}
+        )
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'missing']),
+            {'a': 1, 'b': [1, 2], 'c': True}
+        )
+        self.assertIs(self.cache.get('c'), True)
+        self.assertFalse(self.cache.add('a', 2))
+        self.assertTrue(self.cache.has_key('a'))
+
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get('a', 'default'), 'default')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('posts:page:1'))
+
+    def test_expiry(self):
+        self.cache.set('gone', 1, 0)
+        self.cache.set('kept', 1, None)
+
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertEqual(self.cache.get('gone'), 2)
+        self.assertTrue(self.cache.touch('kept', 0))
+        self.assertFalse(self.cache.has_key('kept'))
+
+    def test_workers_share_entries_and_invalidations(self):
+        other = self.worker()
+
+        self.cache.set('posts:generation:global', 1)
+        self.assertEqual(other.get('posts:generation:global'), 1)
+
+        other.incr('posts:generation:global')
+        self.assertEqual(self.cache.get('posts:generation:global'), 2)
+
+        other.delete('posts:generation:global')
+        self.assertIsNone(self.cache.get('posts:generation:global'))
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_add_many, args=(self.location, 100))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(self.cache.get('counter'), 400)
+        self.assertEqual(self.cache.incr('counter', 10), 410)
+        self.cache.set('ratio', 0.5)
+        self.assertEqual(self.cache.incr('ratio'), 1.5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.worker(max_bytes=4000)
+        value = 'x' * 300
+        cache.set('posts:old', value)
+        cache.set('posts:used', value)
+        with mock.patch.object(file_cache, 'ACCESS_RESOLUTION', 0):
+            cache.get('posts:used')
+            for number in range(20):
+                cache.set(f'posts:fill:{number}', value)
+                cache.get('posts:used')
+
+        stats = cache.stats()
+        self.assertIsNone(cache.get('posts:old'))
+        self.assertEqual(cache.get('posts:used'), value)
+        self.assertLessEqual(
+            sum(prefix['bytes'] for prefix in stats.values()), 4000
+        )
+        self.assertGreater(stats['posts:fill']['evictions'], 0)
+        self.assertGreater(stats['posts:old']['evictions'], 0)
+
+    def test_stats_per_prefix(self):
+        self.cache.set('posts:page:1', 'page')
+        self.cache.set('posts:page:2', 'page')
+        self.cache.set('users:session:abc', {})
+        self.cache.get('posts:page:1')
+        self.cache.get_many(['posts:page:2', 'posts:page:3'])
+
+        stats = self.cache.stats()
+
+        self.assertEqual(stats['posts:page']['entries'], 2)
+        self.assertEqual(stats['posts:page']['hits'], 2)
+        self.assertEqual(stats['posts:page']['misses'], 1)
+        self.assertGreater(stats['posts:page']['bytes'], 0)
+        self.assertEqual(stats['users:session']['entries'], 1)
+        self.assertEqual(
+            key_prefix('template.cache.feed.abc'), 'template.cache'
+        )
+        self.assertEqual(
+            key_prefix('sorl-thumbnail||image||abc'), 'sorl-thumbnail||image'
+        )
+
+
+class PrivateCacheTest(SimpleTestCase):
+    def test_tests_do_not_share_the_site_cache(self):
+        self.assertNotEqual(
+            settings.CACHES['default']['LOCATION'],
+            os.path.join(settings.BASE_DIR, 'cache.sqlite3')
+        )
+
+    def test_private_cache_is_a_temporary_file(self):
+        outer = caches['default']
+        outer.set('posts:page:1', 'page')
+
+        with private_cache():
+            inner = caches['default']
+            location = settings.CACHES['default']['LOCATION']
+            inner.clear()
+            self.assertIsNot(inner, outer)
+            self.assertIsNone(inner.get('posts:page:1'))
+
+        self.assertEqual(outer.get('posts:page:1'), 'page')
+        self.assertFalse(os.path.exists(location))
@@ -0,0 +1,94 @@
+import re
+
+from django.urls import reverse
+
+from posts.metrics import Histogram
+from posts.tests.test_settings import AllSettings
+
+
+class MetricsTest(AllSettings):
+    def sample(self, text, name, **labels):
+        selector = ','.join(
+            f'{key}="{value}"' for key, value in labels.items()
+        )
+        match = re.search(
+            rf'^{re.escape(name)}\{{{re.escape(selector)}\}} (\S+)$',
+            text, re.MULTILINE
+        )
+        return float(match.group(1)) if match else 0
+
+    def metrics(self):
+        return self.guest_client.get(reverse('metrics')).content.decode()
+
+    def test_requests_are_recorded_per_view(self):
+        before = self.metrics()
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        after = self.metrics()
+
+        for name in (
+            'yatube_request_duration_seconds_count',
+            'yatube_db_queries_per_request_count',
+            'yatube_template_render_seconds_count',
+        ):
+            self.assertEqual(
+                self.sample(after, name, view='posts:index')
+                - self.sample(before, name, view='posts:index'),
+                2
+            )
+        self.assertGreater(
+            self.sample(after, 'yatube_db_queries_per_request_sum',
+                        view='posts:index')
+            - self.sample(before, 'yatube_db_queries_per_request_sum',
+                          view='posts:index'),
+            0
+        )
+
+    def test_cache_hits_and_misses(self):
+        before = self.metrics()
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        after = self.metrics()
+
+        for result in ('hit', 'miss'):
+            self.assertGreater(
+                self.sample(after, 'yatube_cache_lookups_total',
+                            view='posts:index', result=result)
+                - self.sample(before, 'yatube_cache_lookups_total',
+                              view='posts:index', result=result),
+                0
+            )
+
+    def test_page_cache_events(self):
+        before = self.metrics()
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        after = self.metrics()
+
+        for event in ('hit', 'miss', 'store'):
+            self.assertEqual(
+                self.sample(after, 'yatube_page_cache_events_total',
+                            view='posts:index', event=event)
+                - self.sample(before, 'yatube_page_cache_events_total',
+                              view='posts:index', event=event),
+                1
+            )
+
+    def test_endpoint_is_internal_only(self):
+        response = self.guest_client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.7'
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test', (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, 'view')
+
+        lines = histogram.expose()
+
+        self.assertIn('test_seconds_bucket{view="view",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="view",le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{view="view",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count{view="view"} 4', lines)
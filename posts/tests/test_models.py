@@ -1,4 +1,6 @@
-from posts.models import Comment, Follow, Group, Like, Post
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Group, Like, Post
 from posts.tests.test_settings import AllSettings
 
 
@@ -157,3 +159,94 @@ class LikeModelTest(Addition):
             str(self.like),
             f'{self.like.user} поставил лайк посту {self.like.post.id}'
         )
+
+
+class CountersTest(Addition):
+    def refresh_post(self):
+        self.post.refresh_from_db(fields=('likes_count', 'comments_count'))
+
+    def test_counters_follow_likes_and_comments(self):
+        self.refresh_post()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+        Like.objects.create(user=self.user_2, post=self.post)
+        Comment.objects.create(post=self.post, author=self.user, text='Ок')
+        self.refresh_post()
+        self.assertEqual(self.post.likes_count, 2)
+        self.assertEqual(self.post.comments_count, 2)
+
+        self.like.delete()
+        self.comment.delete()
+        self.refresh_post()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_counters_follow_cascade_delete(self):
+        self.user_3.likes.create(post=self.post)
+        self.user_3.comments.create(post=self.post, text='Удалюсь')
+        self.user_3.delete()
+
+        self.refresh_post()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class AuthorStatsTest(Addition):
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_stats_follow_posts_likes_and_follows(self):
+        stats = self.stats(self.user)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.likes_count, 1)
+        self.assertEqual(stats.following_count, 1)
+        self.assertEqual(self.stats(self.user_2).followers_count, 1)
+
+        self.follow.delete()
+        self.like.delete()
+        Post.objects.create(text='Ещё один', author=self.user)
+
+        stats = self.stats(self.user)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.likes_count, 0)
+        self.assertEqual(stats.following_count, 0)
+        self.assertEqual(self.stats(self.user_2).followers_count, 0)
+
+    def test_post_delete_takes_its_likes_away(self):
+        Like.objects.create(user=self.user_2, post=self.post)
+        Post.objects.filter(pk=self.post.pk).delete()
+
+        stats = self.stats(self.user)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.likes_count, 0)
+
+
+class GroupActivityTest(AllSettings):
+    def refresh_groups(self):
+        self.group.refresh_from_db()
+        self.group_without_post.refresh_from_db()
+
+    def test_activity_follows_new_moved_and_deleted_posts(self):
+        self.refresh_groups()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(self.group.last_post_at, self.post.pub_date)
+        self.assertEqual(self.group_without_post.posts_count, 0)
+        self.assertIsNone(self.group_without_post.last_post_at)
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[self.user, self.post.id]),
+            {'text': self.post.text, 'group': self.group_without_post.id}
+        )
+        self.refresh_groups()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.group.last_post_at, self.posts_follow.pub_date)
+        self.assertEqual(self.group_without_post.posts_count, 1)
+        self.assertEqual(
+            self.group_without_post.last_post_at, self.post.pub_date
+        )
+
+        Post.objects.get(pk=self.post.pk).delete()
+        self.refresh_groups()
+        self.assertEqual(self.group_without_post.posts_count, 0)
+        self.assertIsNone(self.group_without_post.last_post_at)
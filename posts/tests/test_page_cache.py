@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Like, Post
+from posts.page_cache import page_cache_stats
+from posts.tests.test_settings import AllSettings
+
+User = get_user_model()
+
+
+class PageCacheTest(AllSettings):
+    def setUp(self):
+        super().setUp()
+        self.other_post = Post.objects.create(
+            text='Пост без группы', author=self.user_3
+        )
+
+    def get_twice(self, url):
+        """
+        The function requests a page twice, the second time from cache
+
+        The entrance accepts:
+            ~ url - address of the page
+        """
+        first = self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.guest_client.get(url)
+        return first, second, queries
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user]),
+            reverse('posts:post', args=[self.user, self.post.id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                hits = page_cache_stats()['hits']
+                first, second, queries = self.get_twice(url)
+
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(len(queries), 0)
+                self.assertEqual(page_cache_stats()['hits'], hits + 1)
+
+    def test_authorized_pages_are_not_cached(self):
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        hits = page_cache_stats()['hits']
+
+        self.authorized_client.get(url)
+
+        self.assertEqual(page_cache_stats()['hits'], hits)
+
+    def test_write_purges_pages_showing_changed_objects(self):
+        index = reverse('posts:index')
+        post_page = reverse('posts:post', args=[self.user, self.post.id])
+        self.get_twice(index)
+        self.get_twice(post_page)
+
+        Like.objects.create(user=self.user_2, post=self.post)
+
+        for url in (index, post_page):
+            with self.subTest(url=url):
+                misses = page_cache_stats()['misses']
+                self.guest_client.get(url)
+                self.assertEqual(page_cache_stats()['misses'], misses + 1)
+
+    def test_write_keeps_unrelated_pages(self):
+        url = reverse('posts:post', args=[self.user_3, self.other_post.id])
+        self.get_twice(url)
+
+        Comment.objects.create(post=self.post, author=self.user_2, text='!')
+        Follow.objects.create(user=self.user_2, author=self.user)
+
+        hits = page_cache_stats()['hits']
+        self.guest_client.get(url)
+        self.assertEqual(page_cache_stats()['hits'], hits + 1)
+
+    def test_renamed_user_is_renamed_on_cached_pages(self):
+        Comment.objects.create(post=self.post, author=self.user_2, text='!')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:post', args=[self.user, self.post.id]),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+
+        author = User.objects.get(pk=self.user_2.pk)
+        author.username = 'Akakii_renamed'
+        author.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, '@Akakii_renamed')
+                self.assertNotContains(response, '@Akakii_2')
+        response = self.authorized_client.get(reverse(
+            'posts:post', args=[author.username, self.posts_follow.id]
+        ))
+        self.assertContains(response, '@Akakii_renamed')
+
+
+class ConditionalGetTest(AllSettings):
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user]),
+            reverse('posts:post', args=[self.user, self.post.id]),
+        )
+
+    def test_unchanged_pages_answer_not_modified(self):
+        for client in (self.guest_client, self.authorized_client):
+            for url in self.urls():
+                with self.subTest(url=url):
+                    first = client.get(url)
+                    with CaptureQueriesContext(connection) as queries:
+                        second = client.get(
+                            url, HTTP_IF_NONE_MATCH=first['ETag']
+                        )
+
+                    self.assertEqual(second.status_code, 304)
+                    self.assertEqual(second['ETag'], first['ETag'])
+                    self.assertFalse([
+                        query for query in queries.captured_queries
+                        if 'posts_' in query['sql']
+                    ])
+
+    def test_warm_authorized_repeat_makes_no_queries(self):
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(url)
+
+        self.assertContains(response, self.post.text)
+
+    def test_if_modified_since(self):
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+
+        second = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+
+        self.assertEqual(second.status_code, 304)
+
+    def test_changes_and_viewers_get_new_etags(self):
+        url = reverse('posts:profile', args=[self.user])
+        etag = self.guest_client.get(url)['ETag']
+
+        self.assertNotEqual(self.authorized_client.get(url)['ETag'], etag)
+
+        Like.objects.create(user=self.user_2, post=self.post)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_rotated_csrf_token_gets_new_etag(self):
+        url = reverse('posts:post', args=[self.user, self.post.id])
+        client = Client()
+        client.force_login(self.user)
+        first = client.get(url)
+        self.assertIn(settings.CSRF_COOKIE_NAME, client.cookies)
+
+        # login() rotates the token, a signed in user keeps the same pk
+        client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        second = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=second['ETag']).status_code,
+            304
+        )
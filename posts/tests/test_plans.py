@@ -0,0 +1,85 @@
+from django.db import connection
+from django.urls import reverse
+
+from posts import directory
+from posts.models import Comment, Follow, Like
+from posts.paginator import encode_cursor
+from posts.tests.test_settings import AllSettings
+
+
+class QueryPlansTest(AllSettings):
+    """
+    Every query of the feeds must be served by an index: no full table
+    scans and no sorting in a temporary B-tree
+    """
+    def setUp(self):
+        super().setUp()
+        Follow.objects.create(user=self.user, author=self.user_2)
+        Like.objects.create(user=self.user_2, post=self.post)
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.user_2, text='!'
+        )
+        directory.refresh()
+
+    def statements(self, client, url):
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return [
+            (sql, params) for sql, params in statements
+            if sql.lstrip().upper().startswith('SELECT')
+        ]
+
+    def bad_steps(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            steps = [row[-1].replace('TABLE ', '') for row in cursor]
+        return [
+            step for step in steps
+            if 'TEMP B-TREE' in step
+            or (step.startswith('SCAN ') and ' USING ' not in step
+                and step != 'SCAN CONSTANT ROW')
+        ]
+
+    def urls(self):
+        post_cursor = encode_cursor((self.post.pub_date, self.post.id))
+        comment_cursor = encode_cursor(
+            (self.comment.created, self.comment.id)
+        )
+        rank_cursor = encode_cursor((1,))
+        username = self.user.username
+        return [
+            reverse('posts:index'),
+            reverse('posts:index') + f'?after={post_cursor}&page=2',
+            reverse('posts:index') + f'?before={post_cursor}&page=2',
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:group_posts', args=(self.group.slug,))
+            + f'?after={post_cursor}&page=2',
+            reverse('posts:profile', args=(username,)),
+            reverse('posts:profile', args=(username,))
+            + f'?after={post_cursor}&page=2',
+            reverse('posts:post', args=(username, self.post.id)),
+            reverse('posts:post', args=(username, self.post.id))
+            + f'?after={comment_cursor}&page=2',
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + f'?after={post_cursor}&page=2',
+            reverse('posts:all_authors'),
+            reverse('posts:all_authors')
+            + f'?sort=followers&after={rank_cursor}&page=2',
+            reverse('posts:all_authors') + '?sort=activity',
+            reverse('posts:groups'),
+            reverse('posts:groups') + '?sort=activity&page=1',
+            reverse('posts:groups') + '?sort=posts',
+        ]
+
+    def test_views_use_indexes(self):
+        for url in self.urls():
+            for sql, params in self.statements(self.authorized_client, url):
+                with self.subTest(url=url, sql=sql):
+                    self.assertEqual(self.bad_steps(sql, params), [])
@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+
+import posts.settings as posts_settings
+from posts.models import Comment, Post
+from posts.tests.test_settings import AllSettings
+
+User = get_user_model()
+
+
+class SearchTest(AllSettings):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='admin228'
+        )
+
+    def found(self, text, **params):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': text, **params}
+        )
+        return [post.id for post in response.context['page']]
+
+    def test_index_follows_writes(self):
+        post = Post.objects.create(text='Кипарисы у моря', author=self.user)
+        self.assertEqual(self.found('кипарисы'), [post.id])
+
+        post.text = 'Сосны у моря'
+        post.save()
+        self.assertEqual(self.found('кипарисы'), [])
+        self.assertEqual(self.found('сосны'), [post.id])
+
+        post.delete()
+        self.assertEqual(self.found('сосны'), [])
+
+    def test_prefix_query(self):
+        self.assertEqual(self.found('тестов'), [])
+        self.assertCountEqual(
+            self.found('тестов*'), [self.post.id, self.posts_follow.id]
+        )
+
+    def test_comments_are_searched_and_rank_lower(self):
+        commented = Post.objects.create(text='Просто пост', author=self.user)
+        Comment.objects.create(
+            post=commented, author=self.user_2, text='Пеликаны'
+        )
+        own = Post.objects.create(text='Пеликаны', author=self.user_2)
+
+        self.assertEqual(self.found('пеликаны'), [own.id, commented.id])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.found('"NEAR( OR *'), [])
+        self.assertEqual(self.found(''), [])
+
+    def test_keyset_pages(self):
+        posts = [
+            Post.objects.create(text=f'Страница {number}', author=self.user)
+            for number in range(5)
+        ]
+        with mock.patch.object(
+            posts_settings, 'NUMBER_ITEM_PAGINATOR_SEARCH', 2
+        ):
+            first = self.guest_client.get(
+                reverse('posts:search'), {'q': 'страница'}
+            ).context['page']
+            second = self.guest_client.get(
+                reverse('posts:search') + '?q=страница&'
+                + first.next_page_query()
+            ).context['page']
+            back = self.guest_client.get(
+                reverse('posts:search') + '?q=страница&'
+                + second.previous_page_query()
+            ).context['page']
+
+        seen = [post.id for post in first] + [post.id for post in second]
+        self.assertEqual(len(set(seen)), 4)
+        self.assertTrue(set(seen) <= {post.id for post in posts})
+        self.assertEqual(
+            [post.id for post in back], [post.id for post in first]
+        )
+
+    def test_api(self):
+        response = self.guest_client.get(
+            reverse('posts:search_api'), {'q': 'автора'}
+        )
+
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results],
+                         [self.posts_follow.id])
+        self.assertEqual(results[0]['author'], self.user_2.username)
+        self.assertIsNone(response.json()['next'])
+
+    def test_admin_uses_index(self):
+        client = self.client
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'автора'}
+        )
+
+        self.assertEqual(
+            [post.id for post in response.context['cl'].result_list],
+            [self.posts_follow.id]
+        )
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'тестовым'}
+        )
+        self.assertEqual(
+            {post.id for post in response.context['cl'].result_list},
+            {self.post.id, self.posts_follow.id}
+        )
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO posts_post_fts(posts_post_fts) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(self.found('автора'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.found('автора'), [self.posts_follow.id])
@@ -3,6 +3,7 @@ import tempfile
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase
 
@@ -63,6 +64,7 @@ class AllSettings(TestCase):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.posts_follow = Post.objects.create(
             text='Тестовый пост с тестовым текстом от автора',
             author=self.user_2,
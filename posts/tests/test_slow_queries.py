@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+
+import posts.settings as posts_settings
+from posts.models import Post
+from posts.slow_queries import fingerprint
+from posts.tests.test_settings import AllSettings
+
+
+class SlowQueriesTest(AllSettings):
+    def test_slow_queries_are_logged_with_plan_and_view(self):
+        with mock.patch.object(
+            posts_settings, 'SLOW_QUERY_THRESHOLD_MS', 0
+        ), self.assertLogs('posts.slow_queries', 'WARNING') as logs:
+            self.guest_client.get(reverse('posts:index'))
+
+        entries = [record.query for record in logs.records]
+        feed = [
+            entry for entry in entries
+            if entry['sql'].startswith('SELECT')
+            and '"posts_post"' in entry['sql']
+        ]
+        self.assertTrue(feed)
+        self.assertEqual(feed[0]['view'], 'posts:index')
+        self.assertEqual(feed[0]['path'], reverse('posts:index'))
+        self.assertTrue(feed[0]['plan'])
+        self.assertFalse(
+            any(entry['sql'].startswith('EXPLAIN') for entry in entries)
+        )
+
+    def test_parameter_values_are_logged_on_request_only(self):
+        def logged_params():
+            with mock.patch.object(
+                posts_settings, 'SLOW_QUERY_THRESHOLD_MS', 0
+            ), self.assertLogs('posts.slow_queries', 'WARNING') as logs:
+                list(Post.objects.filter(text='секрет').filter(id__gt=0))
+            return logs.records[0].query['params']
+
+        self.assertEqual(logged_params(), ['str', 'int'])
+        with mock.patch.object(posts_settings, 'SLOW_QUERY_LOG_PARAMS', True):
+            self.assertEqual(logged_params(), ['секрет', '0'])
+
+    def test_fast_queries_are_not_logged(self):
+        with mock.patch(
+            'posts.slow_queries.logger.warning'
+        ) as warning:
+            list(Post.objects.all())
+
+        warning.assert_not_called()
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND x = 1'),
+            fingerprint('SELECT *  FROM t WHERE id IN (%s) AND x = 25'),
+        )
+        self.assertNotEqual(
+            fingerprint('SELECT * FROM t WHERE id = %s'),
+            fingerprint('SELECT * FROM u WHERE id = %s'),
+        )
+
+
+class SlowQueriesCommandTest(AllSettings):
+    def test_summary_groups_by_fingerprint(self):
+        entries = [
+            {'fingerprint': 'aaa', 'duration_ms': 150, 'sql': 'SELECT 1',
+             'params': [], 'view': 'posts:index', 'plan': ['SCAN t']},
+            {'fingerprint': 'aaa', 'duration_ms': 250, 'sql': 'SELECT 2',
+             'params': [], 'view': 'posts:profile', 'plan': ['SCAN t']},
+            {'fingerprint': 'bbb', 'duration_ms': 300, 'sql': 'SELECT 3',
+             'params': [], 'view': None, 'plan': None},
+        ]
+        file = tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', delete=False
+        )
+        with file:
+            file.write('\n'.join(json.dumps(entry) for entry in entries))
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+
+        call_command('slow_queries', file=file.name, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('aaa: 2 times, total 400.0 ms', lines[0])
+        self.assertIn('posts:index, posts:profile', lines[1])
+        self.assertIn('SELECT 2', lines[2])
+        self.assertIn('plan: SCAN t', out.getvalue())
+        self.assertTrue(lines[5].startswith('bbb'))
@@ -0,0 +1,186 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default
+
+import posts.settings as posts_settings
+import posts.tests.constants as constants
+from posts import thumbnails
+from posts.generations import GLOBAL, generations, scope
+from posts.models import Comment, Post
+from posts.tests.test_settings import AllSettings
+
+
+def run_on_commit(callback):
+    callback()
+
+
+@mock.patch.object(posts_settings, 'THUMBNAIL_WORKERS', 0)
+class ThumbnailsTest(AllSettings):
+    def gif(self, name='small.gif'):
+        return SimpleUploadedFile(
+            name=name, content=constants.SMALL_GIF, content_type='image/gif'
+        )
+
+    def test_feed_shows_placeholder_without_generating(self):
+        with mock.patch.object(thumbnails, 'get_thumbnail') as generate:
+            response = self.guest_client.get(reverse('posts:index'))
+
+        generate.assert_not_called()
+        self.assertContains(response, 'thumbnail_placeholder')
+        self.assertIsNone(thumbnails.ready(self.post.image, '700x339'))
+
+    def test_new_post_queues_its_geometries(self):
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', run_on_commit
+        ), mock.patch.object(thumbnails, 'generate') as generate:
+            self.authorized_client.post(
+                reverse('posts:new_post'),
+                {'text': constants.TEXT_POST_NEW, 'image': self.gif()}
+            )
+
+        post = Post.objects.get(text=constants.TEXT_POST_NEW)
+        generate.assert_called_once_with(
+            post.image.name, posts_settings.POST_IMAGE_GEOMETRIES, post
+        )
+
+    def test_profile_edit_queues_avatar(self):
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            self.authorized_client.post(
+                reverse('posts:profile_edit', args=(self.user.username,)),
+                {
+                    'first_name': 'Акакий',
+                    'last_name': 'Акакиевич',
+                    'username': self.user.username,
+                    'avatar': self.gif('avatar.gif'),
+                }
+            )
+
+        self.user.refresh_from_db()
+        enqueue.assert_called_once_with(
+            self.user.avatar, posts_settings.AVATAR_GEOMETRIES, self.user
+        )
+
+    def test_ready_thumbnail_replaces_cached_placeholder(self):
+        self.guest_client.get(reverse('posts:index'))
+
+        with mock.patch.object(thumbnails, 'get_thumbnail') as generate:
+            thumbnails.generate(
+                self.post.image.name, posts_settings.POST_IMAGE_GEOMETRIES,
+                self.post
+            )
+        generate.assert_called_once_with(
+            self.post.image.name, '700x339',
+            **posts_settings.THUMBNAIL_OPTIONS
+        )
+        thumbnail = mock.Mock(url='/media/cache/ready.jpg')
+        with mock.patch.object(thumbnails, 'ready', return_value=thumbnail):
+            response = self.guest_client.get(reverse('posts:index'))
+
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, 'thumbnail_placeholder')
+
+    def test_new_avatar_bumps_pages_showing_the_user(self):
+        Comment.objects.create(post=self.post, author=self.user_3, text='!')
+        shown = (GLOBAL, scope('author', self.user_3.pk),
+                 scope('post', self.post.pk))
+        other = scope('author', self.user.pk)
+        before = [generations(name) for name in (*shown, other)]
+
+        with mock.patch.object(thumbnails, 'get_thumbnail'):
+            thumbnails.generate(
+                self.user_3.avatar.name, posts_settings.AVATAR_GEOMETRIES,
+                self.user_3
+            )
+
+        for name, previous in zip(shown, before):
+            with self.subTest(scope=name):
+                self.assertNotEqual(generations(name), previous)
+        self.assertEqual(generations(other), before[-1])
+
+    def test_ready_avatar_replaces_cached_comment_placeholder(self):
+        Comment.objects.create(post=self.post, author=self.user_3, text='!')
+        url = reverse('posts:post', args=(self.user.username, self.post.id))
+        self.assertContains(
+            self.authorized_client.get(url), 'thumbnail_placeholder'
+        )
+
+        with mock.patch.object(thumbnails, 'get_thumbnail'):
+            thumbnails.generate(
+                self.user_3.avatar.name, posts_settings.AVATAR_GEOMETRIES,
+                self.user_3
+            )
+        thumbnail = mock.Mock(url='/media/cache/avatar.jpg')
+        with mock.patch.object(thumbnails, 'ready', return_value=thumbnail):
+            response = self.authorized_client.get(url)
+
+        self.assertContains(
+            response, f'<img style="border-radius: 10px" src="{thumbnail.url}"'
+        )
+
+    def test_jobs_are_deduplicated(self):
+        job = (self.post.image.name, ('700x339',), None)
+        thumbnails._pending.add(job)
+        try:
+            with mock.patch.object(thumbnails, '_run') as run:
+                thumbnails._submit(job)
+        finally:
+            thumbnails._pending.discard(job)
+
+        run.assert_not_called()
+
+
+class ThumbnailResolverTest(AllSettings):
+    def store(self, file_, geometry):
+        thumbnail = thumbnails.thumbnail_file(file_, geometry)
+        thumbnail.set_size((700, 339))
+        default.kvstore.set(thumbnail)
+        return thumbnail
+
+    def kvstore_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        return response, [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+
+    def test_feed_resolves_all_images_in_one_query(self):
+        for number in range(5):
+            Post.objects.create(
+                text=f'Пост {number}', author=self.user, image=self.uploaded
+            )
+        ready = self.store(self.post.image, '700x339')
+
+        response, queries = self.kvstore_queries(reverse('posts:index'))
+
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, ready.url)
+        self.assertContains(response, 'thumbnail_placeholder')
+
+    def test_comment_avatars_resolve_in_one_query(self):
+        for user in (self.user, self.user_2, self.user_3):
+            Comment.objects.create(post=self.post, author=user, text='!')
+
+        response, queries = self.kvstore_queries(
+            reverse('posts:post', args=(self.user.username, self.post.id))
+        )
+
+        self.assertEqual(len(queries), 1)
+
+    def test_resolve_remembers_misses_in_cache(self):
+        cache.clear()
+        pairs = [(self.post.image, '700x339')]
+        self.assertEqual(thumbnails.resolve(pairs), {
+            (self.post.image.name, '700x339'): None
+        })
+
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.resolve(pairs)
+
+        self.assertEqual(len(queries), 0)
@@ -0,0 +1,144 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import posts.settings as posts_settings
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+from posts.tests.test_settings import AllSettings
+
+
+class TimelineTest(AllSettings):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def timeline_of(self, user):
+        return list(
+            TimelineEntry.objects.filter(user=user)
+            .order_by('-pub_date', '-post')
+            .values_list('post', flat=True)
+        )
+
+    def feed_of(self, client):
+        response = client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page']]
+
+    def test_follow_backfills_timeline(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+
+        self.assertEqual(self.timeline_of(self.user), [self.posts_follow.id])
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+        Follow.objects.create(user=self.user_3, author=self.user_2)
+
+        self.authorized_client_2.post(
+            reverse('posts:new_post'), {'text': 'Новый пост'}
+        )
+
+        post = Post.objects.get(text='Новый пост')
+        self.assertEqual(self.timeline_of(self.user)[0], post.id)
+        self.assertEqual(self.timeline_of(self.user_3)[0], post.id)
+        self.assertEqual(self.feed_of(self.authorized_client)[0], post.id)
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+        Follow.objects.create(user=self.user, author=self.user_3)
+        post_3 = Post.objects.create(author=self.user_3, text='Пост')
+
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.user_2])
+        )
+
+        self.assertEqual(self.timeline_of(self.user), [post_3.id])
+        self.assertEqual(self.feed_of(self.authorized_client), [post_3.id])
+
+    def test_celebrity_posts_are_merged_on_read(self):
+        with mock.patch.object(
+            posts_settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 0
+        ):
+            Follow.objects.create(user=self.user, author=self.user_2)
+            cache.clear()
+            post = Post.objects.create(author=self.user_2, text='Звезда')
+
+            self.assertNotIn(post.id, self.timeline_of(self.user))
+            self.assertEqual(
+                self.feed_of(self.authorized_client),
+                [post.id, self.posts_follow.id]
+            )
+
+    def test_rebuild_timelines(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+        TimelineEntry.objects.all().delete()
+
+        call_command('rebuild_timelines', stdout=StringIO())
+
+        self.assertEqual(self.timeline_of(self.user), [self.posts_follow.id])
+
+    def test_rebuild_keeps_latest_posts_of_every_follow(self):
+        newer = [
+            Post.objects.create(author=self.user_2, text=f'Пост {number}')
+            for number in range(2)
+        ]
+        Follow.objects.create(user=self.user, author=self.user_2)
+        Follow.objects.create(user=self.user_3, author=self.user_2)
+        Follow.objects.create(user=self.user_3, author=self.user)
+
+        with mock.patch.object(
+            posts_settings, 'TIMELINE_BACKFILL_LIMIT', 2
+        ), CaptureQueriesContext(connection) as queries:
+            timeline.rebuild()
+
+        latest = [newer[1].id, newer[0].id]
+        self.assertEqual(self.timeline_of(self.user), latest)
+        self.assertEqual(
+            self.timeline_of(self.user_3), [*latest, self.post.id]
+        )
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+        cache.clear()
+        with mock.patch.object(
+            posts_settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 1
+        ):
+            timeline.rebuild()
+
+        self.assertEqual(self.timeline_of(self.user), [])
+        self.assertEqual(self.timeline_of(self.user_3), [self.post.id])
+
+    def test_celebrity_threshold_crossed_both_ways(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+        timeline.celebrity_ids()
+
+        with mock.patch.object(
+            posts_settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 0
+        ):
+            cache.delete(timeline.CELEBRITIES_CACHE_KEY)
+            self.assertIn(self.user_2.id, timeline.celebrity_ids())
+            post = Post.objects.create(author=self.user_2, text='Звезда')
+            Follow.objects.create(user=self.user_3, author=self.user_2)
+
+            self.assertNotIn(post.id, self.timeline_of(self.user))
+            self.assertEqual(self.timeline_of(self.user_3), [])
+            self.assertEqual(
+                self.feed_of(self.authorized_client),
+                [post.id, self.posts_follow.id]
+            )
+
+        cache.delete(timeline.CELEBRITIES_CACHE_KEY)
+        self.assertNotIn(self.user_2.id, timeline.celebrity_ids())
+
+        expected = [post.id, self.posts_follow.id]
+        self.assertEqual(self.timeline_of(self.user), expected)
+        self.assertEqual(self.timeline_of(self.user_3), expected)
+        self.assertEqual(self.feed_of(self.authorized_client), expected)
+        self.assertEqual(self.feed_of(self.authorized_client_3), expected)
@@ -1,11 +1,15 @@
+from unittest import mock
+
 from django import forms
 from django.contrib.flatpages.models import FlatPage
 from django.contrib.sites.models import Site
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 import posts.settings as posts_settings
-from posts.models import Follow, Group, Post
+from posts.models import Comment, Follow, Group, Like, Post
 from posts.tests.test_settings import AllSettings
 
 
@@ -58,6 +62,25 @@ class Addition(AllSettings):
         self.assertEqual(first_item, check_with)
         self.assertEqual(page_len, expected_count)
 
+    def count_queries(self, client, url, setting, per_page):
+        """
+        The function returns the number of queries for one page of a feed
+
+        The entrance accepts:
+            ~ client - from which client the request is made
+            ~ url - address of the feed
+            ~ setting - name of the page size setting of the feed
+            ~ per_page - how many items should be on one page
+        """
+        with mock.patch.object(posts_settings, setting, per_page):
+            cache.clear()
+            client.get(url)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+        self.assertEqual(len(response.context['page']), per_page)
+        return len(queries)
+
 
 class ViewsTest(Addition):
     @classmethod
@@ -137,6 +160,14 @@ class ViewsTest(Addition):
             posts_settings.NUMBER_ITEM_PAGINATOR_ALL_GROUPS
         )
 
+    def test_groups_sorted_by_activity(self):
+        response = self.authorized_client.get(
+            reverse('posts:groups'), {'sort': 'activity'}
+        )
+
+        self.assertEqual(response.context['page'][0], self.group)
+        self.assertEqual(response.context['sort'], 'activity')
+
     def test_show_correct_context_new_post(self):
         response = self.authorized_client.get(reverse('posts:new_post'))
 
@@ -195,22 +226,176 @@ class ViewsTest(Addition):
                 )
 
     def test_cash(self):
-        response = self.authorized_client.get(reverse('posts:index'))
-        should_be_content = response.content
+        url = reverse('posts:index')
+        should_be_content = self.authorized_client.get(url).content
+        with CaptureQueriesContext(connection) as queries:
+            cached_content = self.authorized_client.get(url).content
         Post.objects.create(
             text='Просто текст',
             author=self.user
         )
+        content_with_new_post = self.authorized_client.get(url).content
 
-        response = self.authorized_client.get(reverse('posts:index'))
-        content_without_new_post = response.content
+        self.assertEqual(cached_content, should_be_content)
+        self.assertFalse(
+            [query for query in queries.captured_queries
+             if 'posts_post' in query['sql']],
+            'Cached index page should not query posts'
+        )
+        self.assertNotEqual(content_with_new_post, should_be_content)
+        self.assertIn('Просто текст', content_with_new_post.decode())
+
+    def test_cache_does_not_leak_like_state(self):
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        Like.objects.create(user=self.user, post=self.post)
+
+        liked = self.authorized_client.get(url).content.decode()
+        not_liked = self.authorized_client_2.get(url).content.decode()
+
+        self.assertIn('like-active.png', liked)
+        self.assertNotIn('like-active.png', not_liked)
+
+    def test_cache_invalidated_by_comment(self):
+        url = reverse('posts:group_posts', args=[self.group.slug])
+        before = self.guest_client.get(url).content
+        Comment.objects.create(
+            post=self.post, author=self.user_2, text='Комментарий'
+        )
+
+        self.assertNotEqual(self.guest_client.get(url).content, before)
+
+
+class FeedQueriesTest(Addition):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        users = (cls.user, cls.user_2, cls.user_3)
+        for i in range(12):
+            post = Post.objects.create(
+                author=users[i % 3],
+                text=f'Пост для ленты {i}',
+                group=cls.group,
+            )
+            Like.objects.create(user=users[(i + 1) % 3], post=post)
+        Follow.objects.create(user=cls.user, author=cls.user_2)
+        Follow.objects.create(user=cls.user, author=cls.user_3)
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        feeds = {
+            reverse('posts:index'): 'NUMBER_ITEM_PAGINATOR_POST',
+            reverse('posts:group_posts', args=[self.group.slug]):
+                'NUMBER_ITEM_PAGINATOR_POST',
+            reverse('posts:profile', args=[self.user_2]):
+                'NUMBER_ITEM_PAGINATOR_POST',
+            reverse('posts:follow_index'): 'NUMBER_ITEM_PAGINATOR_POST',
+        }
+        for url, setting in feeds.items():
+            with self.subTest(url=url):
+                client = self.authorized_client
+                self.assertEqual(
+                    self.count_queries(client, url, setting, 2),
+                    self.count_queries(client, url, setting, 4),
+                    f'Number of queries on {url} depends on page size'
+                )
+
+    def test_comments_queries_do_not_grow_with_page_size(self):
+        users = (self.user, self.user_2, self.user_3)
+        for i in range(6):
+            Comment.objects.create(
+                post=self.post, author=users[i % 3], text=f'Коммент {i}'
+            )
+        url = reverse('posts:post', args=[self.user, self.post.id])
+
+        self.assertEqual(
+            self.count_queries(
+                self.authorized_client, url,
+                'NUMBER_ITEM_PAGINATOR_COMMENTS', 2
+            ),
+            self.count_queries(
+                self.authorized_client, url,
+                'NUMBER_ITEM_PAGINATOR_COMMENTS', 5
+            ),
+        )
+
+
+class KeysetPaginationTest(Addition):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for i in range(25):
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+
+    def walk(self, url):
+        """
+        The function walks a feed from the first to the last page
+
+        The entrance accepts:
+            ~ url - address of the feed
+        """
+        pages = []
+        query = ''
+        while True:
+            response = self.guest_client.get(f'{url}?{query}')
+            page = response.context['page']
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            query = page.next_page_query()
+
+    def test_walk_through_all_posts(self):
+        pages = self.walk(reverse('posts:index'))
+
+        walked = [post for page in pages for post in page]
+        self.assertEqual(walked, list(Post.objects.order_by('-pub_date')))
+        self.assertEqual(
+            [page.number for page in pages], list(range(1, len(pages) + 1))
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
 
+    def test_previous_page_returns_same_posts(self):
+        url = reverse('posts:index')
+        pages = self.walk(url)
+
+        response = self.guest_client.get(
+            f'{url}?{pages[2].previous_page_query()}'
+        )
+
+        self.assertEqual(list(response.context['page']), list(pages[1]))
+        response = self.guest_client.get(
+            f'{url}?{pages[1].previous_page_query()}'
+        )
+        self.assertEqual(list(response.context['page']), list(pages[0]))
+        self.assertFalse(response.context['page'].has_previous())
+
+    def test_broken_cursor_opens_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'broken', 'page': 'x'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page'].number, 1)
+
+    def test_deep_page_costs_as_first_one(self):
+        url = reverse('posts:index')
+        pages = self.walk(url)
         cache.clear()
-        response = self.authorized_client.get(reverse('posts:index'))
-        content_with_new_post = response.content
+        with CaptureQueriesContext(connection) as first:
+            self.guest_client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as deep:
+            self.guest_client.get(f'{url}?{pages[-2].next_page_query()}')
 
-        self.assertEqual(content_without_new_post, should_be_content)
-        self.assertNotEqual(content_with_new_post, should_be_content)
+        first, deep = (
+            [query['sql'] for query in captured.captured_queries
+             if 'posts_post' in query['sql']]
+            for captured in (first, deep)
+        )
+        self.assertEqual(len(first), len(deep))
+        for sql in first + deep:
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
 
 
 class FollowTest(Addition):
@@ -245,20 +430,81 @@ class FollowTest(Addition):
         )
         self.assertEqual(Follow.objects.count(), 0)
 
-# class LikeTest(Addition):
-#     def test_like(self):
-#         like_count = Like.objects.count()
-#
-#         response = self.authorized_client_2.get(
-#             reverse('posts:like_or_unlike', args=[self.user, self.post.id])+'?next='+reverse('posts:profile', args=[self.user.username])
-#         )
-#
-#         self.assertRedirects(
-#             response,
-#             reverse(response.request['QUERY_STRING'].split('=')[1])
-#         )
-#         #
-#         # self.assertEqual(Follow.objects.count(), follow_count + 1)
-#         # like = Like.objects.last()
-#         # self.assertEqual(follow.user, self.user_2)
-#         # self.assertEqual(follow.author, self.user)
+    def test_follow_feed_shows_follow_changes(self):
+        url = reverse('posts:follow_index')
+        self.assertNotIn(
+            self.posts_follow.text,
+            self.authorized_client.get(url).content.decode()
+        )
+
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.user_2])
+        )
+        self.assertIn(
+            self.posts_follow.text,
+            self.authorized_client.get(url).content.decode()
+        )
+
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.user_2])
+        )
+        self.assertNotIn(
+            self.posts_follow.text,
+            self.authorized_client.get(url).content.decode()
+        )
+
+
+class LikeTest(Addition):
+    def toggle(self, client):
+        return client.post(
+            reverse('posts:like_toggle', args=[self.user, self.post.id])
+        )
+
+    def test_toggle_returns_state_and_count(self):
+        response = self.toggle(self.authorized_client_2)
+
+        self.assertEqual(
+            response.json(), {'liked': True, 'likes_count': 1}
+        )
+        self.assertTrue(
+            Like.objects.filter(user=self.user_2, post=self.post).exists()
+        )
+
+        response = self.toggle(self.authorized_client_2)
+
+        self.assertEqual(
+            response.json(), {'liked': False, 'likes_count': 0}
+        )
+        self.assertFalse(Like.objects.exists())
+
+    def test_toggle_is_keyed_on_the_requester(self):
+        Like.objects.create(user=self.user, post=self.post)
+
+        response = self.toggle(self.authorized_client_2)
+
+        self.assertEqual(
+            response.json(), {'liked': True, 'likes_count': 2}
+        )
+
+    def test_toggle_needs_post_and_login(self):
+        url = reverse('posts:like_toggle', args=[self.user, self.post.id])
+
+        self.assertEqual(self.authorized_client.get(url).status_code, 405)
+        self.assertEqual(self.guest_client.post(url).status_code, 302)
+        self.assertFalse(Like.objects.exists())
+
+    def test_link_fallback_redirects_back(self):
+        profile = reverse('posts:profile', args=[self.user.username])
+
+        response = self.authorized_client_2.get(
+            reverse('posts:like_or_unlike', args=[self.user, self.post.id]),
+            {'next': profile}
+        )
+
+        self.assertRedirects(
+            response, profile + f'#id_post_{self.post.id}',
+            fetch_redirect_response=False
+        )
+        self.assertTrue(
+            Like.objects.filter(user=self.user_2, post=self.post).exists()
+        )
@@ -0,0 +1,259 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+
+from django.db import close_old_connections, connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+import posts.settings as addition_settings
+
+from .generations import GLOBAL, bump, scope
+from .models import Post
+from .page_cache import item_scopes, user_scopes
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _options(source):
+    # The same defaults sorl's backend adds before naming a thumbnail, so
+    # the names computed here match the ones get_thumbnail() writes
+    backend = default.backend
+    options = dict(addition_settings.THUMBNAIL_OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_file(file_, geometry):
+    """
+    Thumbnail of the image in the geometry, it may not exist yet
+    """
+    source = ImageFile(file_)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, _options(source)
+    )
+    return ImageFile(name, default.storage)
+
+
+def ready(file_, geometry):
+    """
+    Generated thumbnail of the image or None, never generates it
+    """
+    if not file_:
+        return None
+    return default.kvstore.get(thumbnail_file(file_, geometry))
+
+
+def resolve(pairs):
+    """
+    Generated thumbnails of many images at once
+
+    Reads sorl's key-value store with one cache get_many and one query
+    for the keys missing in the cache, instead of a lookup per image.
+    Returns a dict of (image name, geometry) -> thumbnail or None.
+    """
+    pairs = {(str(file_), geometry) for file_, geometry in pairs if file_}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {pair: ready(*pair) for pair in pairs}
+
+    keys = {
+        pair: add_prefix(thumbnail_file(*pair).key) for pair in pairs
+    }
+    values = kvstore.cache.get_many(list(keys.values()))
+    missing = [key for key in keys.values() if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        loaded = {
+            key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+            for key in missing
+        }
+        # Misses are remembered too, the same way sorl's own lookups do
+        kvstore.cache.set_many(
+            loaded, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(loaded)
+
+    resolved = {}
+    for pair, key in keys.items():
+        value = values.get(key)
+        resolved[pair] = (
+            deserialize_image_file(value)
+            if value and value != cached_db_kvstore.EMPTY_VALUE else None
+        )
+    return resolved
+
+
+class ThumbnailResolver:
+    """
+    Thumbnails of everything a page shows, resolved in one batch
+
+    Sources are pages or lists of objects registered by the view. They
+    are read on the first lookup only, so a page rendered from the
+    fragment cache resolves nothing at all.
+    """
+    def __init__(self):
+        self.sources = []
+        self._resolved = None
+
+    def add(self, items, field, geometry):
+        self.sources.append((items, attrgetter(field), geometry))
+
+    def _pairs(self):
+        for items, get_file, geometry in self.sources:
+            for item in items:
+                yield get_file(item), geometry
+
+    def get(self, file_, geometry):
+        if self._resolved is None:
+            self._resolved = resolve(self._pairs())
+        pair = (str(file_), geometry)
+        if pair not in self._resolved:
+            self._resolved[pair] = ready(file_, geometry)
+        return self._resolved[pair]
+
+
+def prefetch(request, items, field, geometry):
+    """
+    Registers images the page shows for the batched lookup
+
+    The entrance accepts:
+        ~ items - page or list of objects
+        ~ field - path to the image field of an object, e.g. 'author.avatar'
+        ~ geometry - geometry string the template shows the image in
+    """
+    resolver = getattr(request, 'thumbnail_resolver', None)
+    if resolver is None:
+        resolver = request.thumbnail_resolver = ThumbnailResolver()
+    resolver.add(items, field, geometry)
+
+
+def prefetch_post_images(request, posts):
+    prefetch(request, posts, 'image', addition_settings.POST_IMAGE_GEOMETRY)
+
+
+def lookup(request, file_, geometry):
+    """
+    Generated thumbnail of the image or None, prefetched if possible
+    """
+    resolver = getattr(request, 'thumbnail_resolver', None)
+    if resolver is None:
+        return ready(file_, geometry)
+    return resolver.get(file_, geometry)
+
+
+def image_scopes(owner):
+    """
+    Cache scopes a page showing the image of the post or the user is
+    tagged with
+    """
+    if isinstance(owner, Post):
+        return (GLOBAL, *item_scopes(owner))
+    return (scope('author', owner.pk),)
+
+
+def purged_scopes(owner):
+    """
+    Cache scopes of all pages showing the image of the post or the user
+
+    Avatars are also shown in fragments keyed on other scopes, comments
+    are keyed on their post, so those scopes are looked up.
+    """
+    if isinstance(owner, Post):
+        return image_scopes(owner)
+    return user_scopes(owner.pk)
+
+
+def generate(name, geometries, owner=None):
+    """
+    Creates the missing thumbnails of the image
+
+    Once anything was created, the scopes of the pages showing the image
+    are bumped, so their cached placeholders are purged.
+    """
+    created = False
+    for geometry in geometries:
+        if ready(name, geometry) is None:
+            get_thumbnail(
+                name, geometry, **addition_settings.THUMBNAIL_OPTIONS
+            )
+            created = True
+    if created and owner is not None:
+        bump(*purged_scopes(owner))
+
+
+def _run(job):
+    close_old_connections()
+    try:
+        generate(*job)
+    except Exception:
+        logger.exception('Thumbnail generation of %s failed', job[0])
+    finally:
+        with _lock:
+            _pending.discard(job)
+        connections.close_all()
+
+
+def _submit(job):
+    global _executor
+    with _lock:
+        if job in _pending:
+            return
+        _pending.add(job)
+        if addition_settings.THUMBNAIL_WORKERS and _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=addition_settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    if addition_settings.THUMBNAIL_WORKERS:
+        _executor.submit(_run, job)
+    else:
+        _run(job)
+
+
+def enqueue(file_, geometries, owner=None):
+    """
+    Queues generation of the thumbnails of the image to the worker pool
+
+    The job starts after the current transaction commits, so workers
+    never see an image the database does not point at yet. Jobs for the
+    same image are deduplicated while they are waiting or running.
+
+    The entrance accepts:
+        ~ file_ - image field file or name in the default storage
+        ~ geometries - geometry strings of the templates showing it
+        ~ owner - post or user the image belongs to, pages showing it are
+          purged once it is ready
+    """
+    if not file_:
+        return
+    job = (str(file_), tuple(geometries), owner)
+    transaction.on_commit(lambda: _submit(job))
+
+
+def enqueue_post_image(post):
+    enqueue(post.image, addition_settings.POST_IMAGE_GEOMETRIES, post)
+
+
+def enqueue_avatar(user):
+    enqueue(user.avatar, addition_settings.AVATAR_GEOMETRIES, user)
@@ -0,0 +1,176 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+
+import posts.settings as addition_settings
+
+from .models import Follow, Post, TimelineEntry
+
+CELEBRITIES_CACHE_KEY = 'posts:timeline:celebrities'
+# The last computed set, kept without expiry to notice authors leaving it
+KNOWN_CELEBRITIES_CACHE_KEY = 'posts:timeline:celebrities:known'
+
+# The latest posts of the selected authors joined to their followers, the
+# same rows backfill() writes for one follow
+BACKFILL_SQL = (
+    'INSERT INTO posts_timelineentry (user_id, post_id, author_id, '
+    'pub_date) SELECT f.user_id, p.id, p.author_id, p.pub_date '
+    'FROM posts_follow f INNER JOIN ('
+    'SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+    'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+    ') AS position FROM posts_post WHERE {authors}'
+    ') p ON p.author_id = f.author_id '
+    'WHERE p.position <= %s ON CONFLICT DO NOTHING'
+)
+
+
+def _backfill_all(author_ids, exclude=False):
+    """
+    Backfills the timelines of all followers of the authors in one query
+
+    The entrance accepts:
+        ~ author_ids - ids of the authors
+        ~ exclude - backfill all other authors instead
+    """
+    author_ids = sorted(author_ids)
+    if author_ids:
+        marks = ', '.join(['%s'] * len(author_ids))
+        authors = f'author_id {"NOT IN" if exclude else "IN"} ({marks})'
+    elif exclude:
+        authors = '1 = 1'
+    else:
+        return
+    with connection.cursor() as db:
+        db.execute(
+            BACKFILL_SQL.format(authors=authors),
+            [*author_ids, addition_settings.TIMELINE_BACKFILL_LIMIT]
+        )
+
+
+def celebrity_ids():
+    """
+    Ids of the authors whose posts are merged into feeds on read
+
+    Posts of a celebrity are neither fanned out nor backfilled, so once an
+    author drops out of the set, the timelines of all followers of the
+    author are backfilled before the feeds stop merging the posts.
+    """
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.values('author')
+            .annotate(followers=Count('id'))
+            .filter(
+                followers__gt=addition_settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+            )
+            .values_list('author', flat=True)
+        )
+        known = cache.get(KNOWN_CELEBRITIES_CACHE_KEY, frozenset())
+        _backfill_all(known - ids)
+        cache.set(KNOWN_CELEBRITIES_CACHE_KEY, ids, None)
+        cache.set(
+            CELEBRITIES_CACHE_KEY, ids,
+            addition_settings.TIMELINE_CELEBRITIES_TTL
+        )
+    return ids
+
+
+def _insert(entries):
+    # Batches are sized by the backend, SQLite caps the number of rows
+    # of one INSERT
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """
+    Pushes a new post into the timelines of the followers of its author
+
+    Posts of authors with a huge audience are not pushed anywhere,
+    follow_feed merges them into the feed on read instead
+    """
+    if post.author_id in celebrity_ids():
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user', flat=True)
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """
+    Copies the latest posts of the author into the timeline of a new follower
+    """
+    if author_id in celebrity_ids():
+        return
+    posts = Post.objects.filter(author=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date
+        in posts[:addition_settings.TIMELINE_BACKFILL_LIMIT]
+    )
+
+
+def prune(user_id, author_id):
+    """
+    Removes posts of the author from the timeline of a former follower
+    """
+    TimelineEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def rebuild():
+    """
+    Fills all timelines from scratch, returns the number of entries
+
+    One INSERT ... SELECT writes every timeline, each follow gets the same
+    latest posts of the author as backfill() would copy.
+    """
+    TimelineEntry.objects.all().delete()
+    _backfill_all(celebrity_ids(), exclude=True)
+    return TimelineEntry.objects.count()
+
+
+def follow_feed(user):
+    """
+    Posts of the followed authors and the ordering to paginate them by
+
+    The common case reads the timeline of the user only. If the user follows
+    celebrities, their posts are merged in on read (hybrid fan-out).
+    """
+    celebrities = celebrity_ids()
+    if celebrities:
+        celebrities = list(
+            Follow.objects.filter(
+                user=user, author__in=celebrities
+            ).values_list('author', flat=True)
+        )
+
+    if not celebrities:
+        return (
+            Post.objects.filter(timeline__user=user),
+            ('-timeline__pub_date', '-timeline__post'),
+        )
+
+    return (
+        Post.objects.filter(
+            Q(id__in=TimelineEntry.objects.filter(
+                user=user
+            ).values('post'))
+            | Q(author__in=celebrities)
+        ),
+        ('-pub_date', '-id'),
+    )
@@ -13,6 +13,8 @@ urlpatterns = [
     ),
     path('follow/', views.follow_index, name='follow_index'),
     path('authors/', views.authors_index, name='all_authors'),
+    path('search/', views.search, name='search'),
+    path('search/api/', views.search_api, name='search_api'),
     path(
         '<str:username>/follow/', views.profile_follow, name='profile_follow'
     ),
@@ -26,6 +28,11 @@ urlpatterns = [
         views.post_like_or_unlike,
         name='like_or_unlike'
     ),
+    path(
+        '<str:username>/<int:post_id>/like/',
+        views.post_like_toggle,
+        name='like_toggle'
+    ),
     path('group/', views.groups, name='groups'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('new/', views.new_post, name='new_post'),
@@ -1,49 +1,130 @@
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.http import is_safe_url
+from django.views.decorators.http import require_POST
 
 import posts.settings as addition_settings
+from users.cache import get_user_or_404
 
+from . import directory, thumbnails, timeline
 from .forms import CommentForm, PostForm, ProfileEditForm, StatusEditForm
-from .models import Comment, Follow, Group, Like, Post
-
-User = get_user_model()
-
-
+from .generations import GLOBAL, fragment_context, scope
+from .models import AuthorRank, Comment, Follow, Group, Like, Post
+from .page_cache import (
+    cache_anonymous_page, conditional_page, item_scopes, tag
+)
+from .paginator import KeysetPaginator
+from .search import SearchPaginator
+
+GROUP_SORTS = {
+    'title': ('title',),
+    'activity': ('-last_post_at', '-id'),
+    'posts': ('-posts_count', '-id'),
+}
+GROUP_SORT_LABELS = (
+    ('title', 'По названию'),
+    ('activity', 'По активности'),
+    ('posts', 'По числу записей'),
+)
+
+
+@conditional_page
+@cache_anonymous_page
 def index(request):
-    post_list = Post.objects.all().annotate_like(request.user)
-    paginator = Paginator(
+    post_list = Post.objects.for_feed(request.user)
+    paginator = KeysetPaginator(
         post_list, addition_settings.NUMBER_ITEM_PAGINATOR_POST
     )
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginator.get_page(request.GET)
+    tag(request, GLOBAL, page=page)
+    thumbnails.prefetch_post_images(request, page)
 
     return render(
         request,
         'posts/index.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            **fragment_context(GLOBAL),
+        }
     )
 
 
-def authors_index(request):
-    all_authors = User.objects.all().order_by('first_name')
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(
+        query, request.user, addition_settings.NUMBER_ITEM_PAGINATOR_SEARCH
+    )
+    page = paginator.get_page(request.GET)
+    thumbnails.prefetch_post_images(request, page)
 
-    paginator = Paginator(
-        all_authors, addition_settings.NUMBER_ITEM_PAGINATOR_ALL_AUTHORS
+    return render(
+        request,
+        'posts/search.html',
+        {'query': query, 'page': page, 'paginator': paginator}
+    )
+
+
+def search_api(request):
+    paginator = SearchPaginator(
+        request.GET.get('q', ''),
+        request.user,
+        addition_settings.NUMBER_ITEM_PAGINATOR_SEARCH
+    )
+    page = paginator.get_page(request.GET)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': post.id,
+                'author': post.author.username,
+                'group': post.group.slug if post.group else None,
+                'text': post.text,
+                'pub_date': post.pub_date,
+                'url': request.build_absolute_uri(
+                    reverse('posts:post', args=(post.author.username, post.id))
+                ),
+            }
+            for post in page
+        ],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def authors_index(request):
+    sort = directory.resolve_sort(request.GET.get('sort'))
+    paginator = KeysetPaginator(
+        AuthorRank.objects.select_related('user'),
+        addition_settings.NUMBER_ITEM_PAGINATOR_ALL_AUTHORS,
+        ordering=(directory.SORTS[sort],)
+    )
+    page = paginator.get_page(request.GET)
+    thumbnails.prefetch(
+        request, page, 'user.avatar',
+        addition_settings.PROFILE_AVATAR_GEOMETRY
     )
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
 
     return render(
         request,
         'profile/authors.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            'sort': sort,
+            'sorts': directory.SORT_LABELS,
+        }
     )
 
 
 def groups(request):
-    all_groups = Group.objects.all().order_by('title')
+    sort = request.GET.get('sort')
+    if sort not in GROUP_SORTS:
+        sort = 'title'
+    all_groups = Group.objects.order_by(*GROUP_SORTS[sort])
 
     paginator = Paginator(
         all_groups, addition_settings.NUMBER_ITEM_PAGINATOR_ALL_GROUPS
@@ -55,25 +136,37 @@ def groups(request):
     return render(
         request,
         'group/groups.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            'sort': sort,
+            'sorts': GROUP_SORT_LABELS,
+        }
     )
 
 
+@conditional_page
+@cache_anonymous_page
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
 
-    posts = group.posts.all().annotate_like(request.user)
-    paginator = Paginator(
+    posts = group.posts.for_feed(request.user)
+    paginator = KeysetPaginator(
         posts, addition_settings.NUMBER_ITEM_PAGINATOR_POST
     )
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginator.get_page(request.GET)
+    tag(request, scope('group', group.id), page=page)
+    thumbnails.prefetch_post_images(request, page)
 
     return render(
         request,
         'group.html',
-        {'group': group, 'page': page, 'paginator': paginator}
+        {
+            'group': group,
+            'page': page,
+            'paginator': paginator,
+            **fragment_context(scope('group', group.id)),
+        }
     )
 
 
@@ -84,23 +177,30 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.enqueue_post_image(post)
         return redirect('posts:index')
 
     return render(request, 'posts/new_post.html', {'form': form})
 
 
+@conditional_page
+@cache_anonymous_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
     is_following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author
     ).exists()
-    paginator = Paginator(
-        author.posts.all().annotate_like(request.user),
+    paginator = KeysetPaginator(
+        author.posts.for_feed(request.user),
         addition_settings.NUMBER_ITEM_PAGINATOR_POST
     )
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginator.get_page(request.GET)
+    tag(request, scope('author', author.id), page=page)
+    thumbnails.prefetch_post_images(request, page)
+    thumbnails.prefetch(
+        request, [author], 'avatar', addition_settings.PROFILE_AVATAR_GEOMETRY
+    )
+    cache_context = fragment_context(scope('author', author.id))
 
     if request.user != author:
         return render(
@@ -111,6 +211,7 @@ def profile(request, username):
                 'paginator': paginator,
                 'author': author,
                 'following': is_following,
+                **cache_context,
             }
         )
 
@@ -124,13 +225,14 @@ def profile(request, username):
             'author': author,
             'following': is_following,
             'form': form,
+            **cache_context,
         }
     )
 
 
 @login_required
 def status_edit(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
 
     if request.user != author:
         return redirect('posts:profile', author)
@@ -146,33 +248,53 @@ def status_edit(request, username):
     return redirect('posts:profile', author)
 
 
+@conditional_page
+@cache_anonymous_page
 def post_view(request, username, post_id):
     post = get_object_or_404(
-        Post.objects.annotate_like(request.user),
+        Post.objects.for_feed(request.user).select_related('author__stats'),
         author__username=username,
         id=post_id
     )
     form = CommentForm()
 
-    paginator = Paginator(
-        post.comments.all(),
-        addition_settings.NUMBER_ITEM_PAGINATOR_COMMENTS
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        addition_settings.NUMBER_ITEM_PAGINATOR_COMMENTS,
+        ordering=('-created', '-id')
+    )
+    page = paginator.get_page(request.GET)
+    tag(request, *item_scopes(post), page=page)
+    thumbnails.prefetch_post_images(request, [post])
+    thumbnails.prefetch(
+        request, [post.author], 'avatar',
+        addition_settings.PROFILE_AVATAR_GEOMETRY
+    )
+    thumbnails.prefetch(
+        request, page, 'author.avatar',
+        addition_settings.COMMENT_AVATAR_GEOMETRY
     )
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
 
     return render(
         request,
         'posts/post.html',
-        {'post': post, 'page': page, 'paginator': paginator, 'form': form}
+        {
+            'post': post,
+            'page': page,
+            'paginator': paginator,
+            'form': form,
+            # The card shows the name of the author
+            **fragment_context(
+                scope('post', post.id), scope('author', post.author_id)
+            ),
+        }
     )
 
 
 @login_required
 def post_edit(request, username, post_id):
     post = get_object_or_404(
-        Post.objects.annotate_like(request.user),
+        Post.objects.select_related('author'),
         author__username=username,
         id=post_id
     )
@@ -188,7 +310,9 @@ def post_edit(request, username, post_id):
     )
 
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue_post_image(post)
         return redirect('posts:post', author, post_id)
 
     return render(
@@ -200,7 +324,7 @@ def post_edit(request, username, post_id):
 
 @login_required
 def profile_edit(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
 
     if request.user != author:
         return redirect('posts:profile', author)
@@ -212,7 +336,9 @@ def profile_edit(request, username):
     )
 
     if form.is_valid():
-        form.save()
+        author = form.save()
+        if 'avatar' in form.changed_data:
+            thumbnails.enqueue_avatar(author)
         return redirect('posts:profile', author)
 
     return render(
@@ -241,25 +367,30 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).annotate_like(request.user)
-    paginator = Paginator(
-        posts, addition_settings.NUMBER_ITEM_PAGINATOR_POST
+    posts, ordering = timeline.follow_feed(request.user)
+    paginator = KeysetPaginator(
+        posts.for_feed(request.user),
+        addition_settings.NUMBER_ITEM_PAGINATOR_POST,
+        ordering=ordering
     )
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginator.get_page(request.GET)
+    thumbnails.prefetch_post_images(request, page)
 
     return render(
         request,
-        'posts/follow.html', {'page': page, 'paginator': paginator}
+        'posts/follow.html',
+        {
+            'page': page,
+            'paginator': paginator,
+            # Follow changes bump the scope of the follower
+            **fragment_context(GLOBAL, scope('author', request.user.id)),
+        }
     )
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
 
@@ -268,7 +399,7 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
 
     return redirect('posts:profile', username=username)
@@ -276,13 +407,29 @@ def profile_unfollow(request, username):
 
 @login_required
 def post_like_or_unlike(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    if Like.objects.filter(user__username=username, post=post).exists():
-        Like.objects.filter(user__username=username, post=post).delete()
-    else:
-        Like.objects.get_or_create(user=request.user, post=post)
+    post = get_object_or_404(
+        Post.objects.only('id'), author__username=username, id=post_id
+    )
+    Like.objects.toggle(request.user, post)
+
+    next_url = request.GET.get('next')
+    if not is_safe_url(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('posts:post', args=(username, post_id))
+    return redirect(next_url + f'#id_post_{post_id}')
+
+
+@login_required
+@require_POST
+def post_like_toggle(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.only('id'), author__username=username, id=post_id
+    )
+    liked = Like.objects.toggle(request.user, post)
+    likes_count = Post.objects.filter(pk=post.pk).values_list(
+        'likes_count', flat=True
+    ).get()
 
-    return redirect(request.GET.get('next') + f'#id_post_{post_id}')
+    return JsonResponse({'liked': liked, 'likes_count': likes_count})
 
 
 @login_required
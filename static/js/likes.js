@@ -0,0 +1,37 @@
+// Likes are toggled in place through the JSON endpoint, the link keeps
+// working as a plain page reload when scripts are off. Only links of
+// signed in users carry the endpoint, the CSRF token is taken from the
+// cookie set at login, so cached pages need no per-request token.
+$(function () {
+  var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+  if (!match) {
+    return;
+  }
+  var token = decodeURIComponent(match[1]);
+
+  $(document).on('click', 'a.like_ico_a[data-toggle-url]', function (event) {
+    var link = $(this);
+    event.preventDefault();
+    if (link.data('busy')) {
+      return;
+    }
+    link.data('busy', true);
+
+    $.ajax({
+      url: link.data('toggle-url'),
+      method: 'POST',
+      headers: {'X-CSRFToken': token},
+      dataType: 'json'
+    }).done(function (data) {
+      var icon = link.find('img.like_ico');
+      icon.attr('src', icon.attr('src').replace(
+        /like(-active)?\.png/, data.liked ? 'like-active.png' : 'like.png'
+      ));
+      link.find('.like_ico_text').text(data.likes_count || '');
+    }).fail(function () {
+      window.location = link.attr('href');
+    }).always(function () {
+      link.data('busy', false);
+    });
+  });
+});
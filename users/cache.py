@@ -0,0 +1,96 @@
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import (
+    AuthenticationMiddleware as BaseAuthenticationMiddleware
+)
+from django.core.cache import cache
+from django.http import Http404
+
+import posts.settings as addition_settings
+
+USER_KEY = 'users:user:{}'
+USERNAME_KEY = 'users:username:{}'
+BACKEND = 'users.cache.CachedModelBackend'
+LEGACY_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+User = get_user_model()
+
+
+def _remember(user):
+    cache.set_many(
+        {
+            USER_KEY.format(user.pk): user,
+            USERNAME_KEY.format(user.username): user.pk,
+        },
+        addition_settings.USER_CACHE_TTL
+    )
+
+
+def get_user(user_id):
+    """
+    User with the id from the cache or the database, None if there is none
+    """
+    user = cache.get(USER_KEY.format(user_id))
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            _remember(user)
+    return user
+
+
+def get_user_by_username(username):
+    """
+    User with the username from the cache or the database
+
+    The username only points at the id, so a user renamed since is
+    checked against the name and looked up in the database again.
+    """
+    user_id = cache.get(USERNAME_KEY.format(username))
+    if user_id is not None:
+        user = get_user(user_id)
+        if user is not None and user.username == username:
+            return user
+    user = User.objects.filter(username=username).first()
+    if user is not None:
+        _remember(user)
+    return user
+
+
+def get_user_or_404(username):
+    user = get_user_by_username(username)
+    if user is None:
+        raise Http404
+    return user
+
+
+def forget(user):
+    """
+    Drops the cached copies of the user, under the old name as well
+    """
+    keys = [USER_KEY.format(user.pk), USERNAME_KEY.format(user.username)]
+    cached = cache.get(keys[0])
+    if cached is not None:
+        keys.append(USERNAME_KEY.format(cached.username))
+    cache.delete_many(keys)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend resolving the user of a session through the user cache
+    """
+    def get_user(self, user_id):
+        user = get_user(user_id)
+        if user is not None and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+class AuthenticationMiddleware(BaseAuthenticationMiddleware):
+    """
+    AuthenticationMiddleware moving sessions signed in with ModelBackend
+    to the cached backend, so the switch signs nobody out
+    """
+    def process_request(self, request):
+        if request.session.get(BACKEND_SESSION_KEY) == LEGACY_BACKEND:
+            request.session[BACKEND_SESSION_KEY] = BACKEND
+        super().process_request(request)
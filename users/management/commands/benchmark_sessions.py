@@ -0,0 +1,145 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import seeding
+from posts.management.commands.benchmark_views import percentile
+from yatube.test_runner import private_cache
+
+User = get_user_model()
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'write_behind': 'users.session_store',
+    'signed_cookies': 'users.signed_session_store',
+}
+VOLUMES = {
+    'users': 50,
+    'groups': 5,
+    'posts': 500,
+    'comments': 1000,
+    'likes': 2000,
+    'follows': 500,
+}
+PASSWORD = 'benchmark-password'
+
+
+def session_queries(queries):
+    return sum('django_session' in query['sql'] for query in queries)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures session queries and latency of signed in requests with '
+        'every session engine'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=30,
+            help='Measured requests per scenario',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Unmeasured requests per scenario before measuring',
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # The benchmark clears the cache, the running site must not notice
+        try:
+            # Password hashing would hide the cost of the session itself
+            with private_cache(), override_settings(
+                DEBUG=False,
+                PASSWORD_HASHERS=[
+                    'django.contrib.auth.hashers.MD5PasswordHasher'
+                ],
+            ):
+                seeding.seed(**VOLUMES)
+                seeding.rebuild_derived()
+                reader = User.objects.create_user(
+                    'session_benchmark', password=PASSWORD
+                )
+                results = {
+                    name: self.measure_engine(engine, reader, options)
+                    for name, engine in ENGINES.items()
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        baseline = results['db']
+        for name, scenarios in results.items():
+            self.stdout.write(name)
+            for scenario, result in scenarios.items():
+                saved = (
+                    baseline[scenario]['session_queries']
+                    - result['session_queries']
+                )
+                self.stdout.write(
+                    f'  {scenario:<14} p50 {result["p50_ms"]:7.1f} ms  '
+                    f'p95 {result["p95_ms"]:7.1f} ms  '
+                    f'queries {result["queries"]:5.1f}  '
+                    f'session queries {result["session_queries"]:4.1f}  '
+                    f'saved {saved:+4.1f}'
+                )
+
+    def measure_engine(self, engine, reader, options):
+        with override_settings(SESSION_ENGINE=engine):
+            cache.clear()
+            client = Client()
+            client.force_login(reader)
+            pages = {
+                'index': reverse('posts:index'),
+                'follow_index': reverse('posts:follow_index'),
+                'profile': reverse('posts:profile', args=(reader.username,)),
+            }
+            results = {
+                name: self.measure(lambda: client.get(url), options)
+                for name, url in pages.items()
+            }
+
+            def login():
+                return Client().post(
+                    reverse('login'),
+                    {'username': reader.username, 'password': PASSWORD},
+                )
+            results['login'] = self.measure(login, options, status=302)
+        return results
+
+    def measure(self, request, options, status=200):
+        def send():
+            response = request()
+            if response.status_code != status:
+                raise CommandError(
+                    f'{response.request["PATH_INFO"]} answered '
+                    f'{response.status_code}'
+                )
+
+        for _ in range(options['warmup']):
+            send()
+
+        timings, queries, sessions = [], [], []
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                send()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            sessions.append(session_queries(captured.captured_queries))
+
+        return {
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'queries': sum(queries) / len(queries),
+            'session_queries': sum(sessions) / len(sessions),
+        }
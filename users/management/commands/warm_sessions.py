@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+import posts.settings as addition_settings
+from users.session_store import SessionStore
+
+
+class Command(BaseCommand):
+    help = 'Copies live database sessions into the session cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=addition_settings.BULK_LOAD_CHUNK_SIZE,
+            help='Sessions read from the database at once',
+        )
+
+    def handle(self, *args, **options):
+        total = SessionStore.warm(options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Sessions cached: {total}')
+        )
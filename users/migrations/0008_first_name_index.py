@@ -0,0 +1,17 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_auto_20201216_1437'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['first_name'], name='user_first_name_idx'),
+        ),
+    ]
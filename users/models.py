@@ -13,3 +13,8 @@ class UserProfile(AbstractUser):
         max_length=200,
         default='У меня ещё нет статуса, но когда-то он должен появиться'
     )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['first_name'], name='user_first_name_idx'),
+        ]
@@ -0,0 +1,117 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.utils import timezone
+
+import posts.settings as addition_settings
+
+KEY_PREFIX = 'users:session:'
+
+
+class SessionStore(DBStore):
+    """
+    Sessions read from the cache and written behind to the database
+
+    A request finds its session in the cache and makes no session queries.
+    A changed session goes to the cache at once. The database gets it only
+    from a save() coming SESSION_WRITE_BEHIND_SECONDS or more after the
+    previous write, there is no background flush: the last changes of a
+    session left alone since stay in the cache only and are lost if its
+    entry is evicted. New sessions are inserted at once, the database
+    keeps session keys unique. Their first save is written through as
+    well: login() stores the user right after creating the session, and
+    an evicted cache must not sign the user out. A session
+    missing in the cache (evicted, or created by the database engine
+    before the switch) is read from the database and cached again.
+    """
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        self._persisted_at = 0.0
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _store(self, data, expiry=None):
+        self._cache.set(
+            self.cache_key, (data, self._persisted_at),
+            self.get_expiry_age(expiry=expiry)
+        )
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Backends like memcached reject some keys, the session is reset
+            entry = None
+        if entry is not None:
+            data, self._persisted_at = entry
+            return data
+
+        session = self._get_session_from_db()
+        if session is None:
+            return {}
+        data = self.decode(session.session_data)
+        self._persisted_at = time.time()
+        self._store(data, session.expire_date)
+        return data
+
+    def exists(self, session_key):
+        return bool(session_key) and (
+            self.cache_key_prefix + session_key in self._cache
+            or super().exists(session_key)
+        )
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        now = time.time()
+        if must_create or (
+            now - self._persisted_at
+            >= addition_settings.SESSION_WRITE_BEHIND_SECONDS
+        ):
+            super().save(must_create)
+            if not must_create:
+                self._persisted_at = now
+        self._store(self._get_session(no_load=must_create))
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+
+    @classmethod
+    def warm(cls, chunk_size):
+        """
+        Copies the live sessions of the database into the cache
+
+        Run after switching from the database engine, so the first request
+        of every signed in user does not go to the database. Returns the
+        number of sessions copied.
+        """
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        now = timezone.now()
+        sessions = cls.get_model_class().objects.filter(expire_date__gt=now)
+        store = cls()
+        total = 0
+        for session in sessions.iterator(chunk_size=chunk_size):
+            cache.set(
+                cls.cache_key_prefix + session.session_key,
+                (store.decode(session.session_data), time.time()),
+                int((session.expire_date - now).total_seconds())
+            )
+            total += 1
+        return total
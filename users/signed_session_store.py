@@ -0,0 +1,25 @@
+import re
+
+from django.contrib.sessions.backends import signed_cookies
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+# Keys of the database engine, a signed cookie always has colons in it
+DATABASE_KEY = re.compile(r'^[a-z0-9]{32}$')
+
+
+class SessionStore(signed_cookies.SessionStore):
+    """
+    Sessions kept in a signed cookie, no session queries at all
+
+    A cookie still holding the key of a database session, issued before
+    the switch, is read from the database once and replaced by a signed
+    cookie with the same data, so the switch signs nobody out.
+    """
+    def load(self):
+        if self.session_key and DATABASE_KEY.match(self.session_key):
+            legacy = DBStore(self.session_key)
+            data = legacy.load()
+            if legacy.session_key is not None:
+                self.modified = True
+                return data
+        return super().load()
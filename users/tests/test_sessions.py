@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import posts.settings as addition_settings
+from posts.tests.test_settings import AllSettings
+from users.session_store import SessionStore
+from users.signed_session_store import SessionStore as SignedStore
+
+
+def session_queries(queries):
+    return [query for query in queries if 'django_session' in query['sql']]
+
+
+class WriteBehindSessionTest(AllSettings):
+    def test_signed_in_request_makes_no_session_queries(self):
+        self.authorized_client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(session_queries(queries.captured_queries), [])
+
+    def test_changes_are_written_behind(self):
+        store = SessionStore()
+        store.create()
+        store['step'] = 1
+        store.save()
+        self.assertEqual(DBStore(store.session_key)['step'], 1)
+
+        store['step'] = 2
+        with CaptureQueriesContext(connection) as queries:
+            store.save()
+
+        self.assertEqual(session_queries(queries.captured_queries), [])
+        self.assertEqual(SessionStore(store.session_key)['step'], 2)
+        self.assertEqual(DBStore(store.session_key)['step'], 1)
+
+        with mock.patch.object(
+            addition_settings, 'SESSION_WRITE_BEHIND_SECONDS', 0
+        ):
+            store['step'] = 3
+            store.save()
+        self.assertEqual(DBStore(store.session_key)['step'], 3)
+
+    def test_database_sessions_stay_signed_in(self):
+        legacy = DBStore()
+        legacy['step'] = 1
+        legacy.create()
+
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(SessionStore(legacy.session_key)['step'], 1)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(SessionStore(legacy.session_key)['step'], 1)
+
+        self.assertEqual(len(session_queries(first.captured_queries)), 1)
+        self.assertEqual(session_queries(second.captured_queries), [])
+
+    def test_warm_sessions(self):
+        legacy = DBStore()
+        legacy['step'] = 1
+        legacy.create()
+
+        call_command('warm_sessions', stdout=mock.Mock())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(SessionStore(legacy.session_key)['step'], 1)
+
+        self.assertEqual(session_queries(queries.captured_queries), [])
+
+    def test_flush_removes_both_copies(self):
+        store = SessionStore()
+        store['step'] = 1
+        store.create()
+        key = store.session_key
+
+        store.flush()
+
+        self.assertFalse(SessionStore().exists(key))
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+
+
+class SignedSessionTest(AllSettings):
+    def test_database_session_is_moved_into_cookie(self):
+        legacy = DBStore()
+        legacy['step'] = 1
+        legacy.create()
+
+        store = SignedStore(legacy.session_key)
+        self.assertEqual(store['step'], 1)
+        self.assertTrue(store.modified)
+        store.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(SignedStore(store.session_key)['step'], 1)
+        self.assertEqual(session_queries(queries.captured_queries), [])
+
+    @override_settings(SESSION_ENGINE='users.signed_session_store')
+    def test_signed_in_request(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(session_queries(queries.captured_queries), [])
@@ -0,0 +1,79 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.tests.test_settings import AllSettings
+from users import cache as user_cache
+
+USER_BY_KEY = 'FROM "users_userprofile" WHERE'
+
+
+def user_queries(queries):
+    return [query for query in queries if USER_BY_KEY in query['sql']]
+
+
+class UserCacheTest(AllSettings):
+    def test_request_user_comes_from_cache(self):
+        self.authorized_client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(user_queries(queries.captured_queries), [])
+
+    def test_profile_views_use_cache(self):
+        for name in ('posts:profile', 'posts:profile_edit'):
+            url = reverse(name, args=(self.user.username,))
+            self.authorized_client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(url)
+
+            with self.subTest(name=name):
+                self.assertEqual(response.context['author'], self.user)
+                self.assertEqual(user_queries(queries.captured_queries), [])
+
+    def test_save_invalidates_both_keys(self):
+        user_cache.get_user_by_username(self.user_3.username)
+        old_name = self.user_3.username
+
+        self.user_3.username = 'Akakii_renamed'
+        self.user_3.status = 'Новый статус'
+        self.user_3.save()
+
+        self.assertIsNone(user_cache.get_user_by_username(old_name))
+        renamed = user_cache.get_user_by_username('Akakii_renamed')
+        self.assertEqual(renamed.status, 'Новый статус')
+        self.assertEqual(
+            user_cache.get_user(self.user_3.pk).username, 'Akakii_renamed'
+        )
+        self.assertEqual(
+            self.guest_client.get(
+                reverse('posts:profile', args=(old_name,))
+            ).status_code,
+            404
+        )
+
+    def test_inactive_user_is_signed_out(self):
+        client = Client()
+        client.force_login(self.user_3)
+        self.user_3.is_active = False
+        self.user_3.save()
+
+        response = client.get(reverse('posts:index'))
+
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_model_backend_sessions_are_moved(self):
+        client = Client()
+        client.force_login(
+            self.user_2, backend=user_cache.LEGACY_BACKEND
+        )
+
+        response = client.get(reverse('posts:index'))
+
+        self.assertEqual(response.context['user'], self.user_2)
+        self.assertEqual(
+            client.session[BACKEND_SESSION_KEY], user_cache.BACKEND
+        )
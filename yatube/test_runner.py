@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+@contextmanager
+def private_cache():
+    """
+    Points the default cache at a temporary file while the block runs
+
+    Tests and benchmarks clear the cache, inside the block they do not
+    touch the file shared by the workers of the running site.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    params = dict(
+        settings.CACHES['default'],
+        LOCATION=os.path.join(directory, 'cache.sqlite3')
+    )
+    try:
+        with override_settings(CACHES={**settings.CACHES, 'default': params}):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class PrivateCacheRunner(DiscoverRunner):
+    """
+    Test runner keeping the tests off the cache of the running site
+    """
+    def setup_test_environment(self, **kwargs):
+        self._private_cache = private_cache()
+        self._private_cache.__enter__()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._private_cache.__exit__(None, None, None)
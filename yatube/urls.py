@@ -5,6 +5,9 @@ from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
 
+from posts.assets import serve as serve_static
+from posts.metrics import metrics_view
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -18,6 +21,13 @@ urlpatterns = [
     path('about/', include('django.contrib.flatpages.urls')),
     path('auth/', include("django.contrib.auth.urls")),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/', include('api.urls')),
+    path(
+        settings.STATIC_URL.lstrip('/') + '<path:path>',
+        serve_static,
+        name='static'
+    ),
     path('', include('posts.urls', namespace='posts')),
 ]
 